@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import platform
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from fakes import BenchBot, FakeChannel, FakeGuild, FakeHttpClient, FakeMessage, next_id
+from functions import get_due_tasks
+from logic import handle_message, propagate_message_edit
+from parsers import ELENORA_BOT_ID
+from storage import JsonStorage, SQLiteStorage
+
+GUILD_COUNT = 50
+CHANNELS_PER_GUILD = 4
+DUE_FRACTION = 0.01
+DESCRIPTION = "**Raid: Vault of Glass**\nSign up below.\n20:30 10/18/2026 (gametime)\nLeader: someone"
+
+def timed(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start_time, result
+
+async def timed_async(coroutine):
+    start_time = time.perf_counter()
+    result = await coroutine
+    return time.perf_counter() - start_time, result
+
+def make_tasks(count, guild_channels, now, due_fraction=DUE_FRACTION):
+    """Unpin and thread deletion tasks spread over the channels, with `due_fraction` of them already due."""
+    rng = random.Random(count)
+    channels = [(guild_id, channel_id) for guild_id, channel_ids in guild_channels.items() for channel_id in channel_ids]
+    tasks = {}
+    for i in range(count):
+        guild_id, channel_id = channels[i % len(channels)]
+        if rng.random() < due_fraction:
+            due_time = now - timedelta(seconds=rng.randint(1, 3600))
+        else:
+            due_time = now + timedelta(seconds=rng.randint(3600, 30 * 24 * 3600))
+
+        if i % 4:
+            task = {'type': 'unpin', 'channel_id': channel_id, 'message_id': next_id(),
+                    'unpin_time': due_time, 'retries': 0, 'id': i + 1}
+        else:
+            task = {'type': 'thread_deletion', 'channel_id': channel_id, 'thread_id': next_id(),
+                    'thread_deletion_time': due_time, 'retries': 0, 'id': i + 1}
+        tasks.setdefault(str(guild_id), []).append(task)
+    return tasks
+
+def setup_bot(webhooks_per_guild=3):
+    bot = BenchBot()
+    guilds = [FakeGuild(next_id()) for _ in range(GUILD_COUNT)]
+    channels = {}
+    for guild in guilds:
+        channels[guild.id] = [bot.add_channel(FakeChannel(next_id(), guild)) for _ in range(CHANNELS_PER_GUILD)]
+    target = bot.add_channel(FakeChannel(next_id(), FakeGuild(next_id())))
+    bot.http_client = FakeHttpClient(target.id)
+
+    bot.monitored_channels = {guild.id: [channel.id for channel in channels[guild.id]] for guild in guilds}
+    bot.save_monitored_channels()
+    bot.settings = {str(guild.id): {'unpin_time': 60, 'thread_deletion_time': 60} for guild in guilds}
+    bot.save_settings()
+    bot.save_webhooks({guild.id: [f"https://discord.com/api/webhooks/{next_id()}/token{i}" for i in range(webhooks_per_guild)]
+                       for guild in guilds})
+    return bot, guilds, channels
+
+async def bench_handle_message(message_count):
+    bot, guilds, channels = setup_bot()
+    channel_list = [channel for guild in guilds for channel in channels[guild.id]]
+    results = {}
+
+    # Chatter from users and other bots, rejected by the routing table
+    messages = [FakeMessage(channel_list[i % len(channel_list)], next_id(), content="hello")
+                for i in range(message_count)]
+    seconds, _ = await timed_async(asyncio.gather(*(handle_message(bot, message) for message in messages)))
+    results['non_matching'] = {'messages': message_count, 'seconds': seconds, 'messages_per_second': message_count / seconds}
+
+    # Sign-up posts that are forwarded to every webhook, pinned and scheduled for unpinning
+    messages = [FakeMessage(channel_list[i % len(channel_list)], ELENORA_BOT_ID, DESCRIPTION, ["Complete the group"])
+                for i in range(message_count)]
+    seconds, _ = await timed_async(asyncio.gather(*(handle_message(bot, message) for message in messages)))
+    results['matching'] = {'messages': message_count, 'seconds': seconds, 'messages_per_second': message_count / seconds,
+                           'webhook_posts': bot.http_client.calls['POST'],
+                           'pins': sum(channel.calls['pin'] for channel in channel_list)}
+
+    await bot.close()
+    return results
+
+async def bench_edit_fanout(message_count, fanouts):
+    results = {}
+    for fanout in fanouts:
+        bot, guilds, channels = setup_bot(webhooks_per_guild=fanout)
+        channel_list = [channel for guild in guilds for channel in channels[guild.id]]
+        messages = [FakeMessage(channel_list[i % len(channel_list)], ELENORA_BOT_ID, DESCRIPTION)
+                    for i in range(message_count)]
+        for message in messages:
+            await handle_message(bot, message)
+
+        seconds, _ = await timed_async(asyncio.gather(*(propagate_message_edit(bot, message) for message in messages)))
+        results[str(fanout)] = {'messages': message_count, 'seconds': seconds,
+                                'edits_per_second': message_count / seconds,
+                                'patches': bot.http_client.calls['PATCH']}
+        await bot.close()
+    return results
+
+async def bench_tasks(size):
+    bot, guilds, channels = setup_bot()
+    now = datetime.now(timezone.utc)
+    tasks = make_tasks(size, {guild.id: [channel.id for channel in channels[guild.id]] for guild in guilds}, now)
+    results = {}
+
+    results['get_due_tasks_seconds'], due_tasks = await timed_async(get_due_tasks(tasks))
+    results['due_tasks'] = len(due_tasks)
+
+    results['schedule_many_seconds'], _ = timed(bot.scheduler.schedule_many, tasks)
+    results['pop_due_seconds'], popped = timed(bot.scheduler.pop_due, now)
+    results['popped_tasks'] = len(popped)
+
+    # reschedule_tasks pops due tasks itself, so start from a fully scheduled heap again
+    bot.task_store.reset(tasks)
+    bot.scheduler.clear()
+    bot.scheduler.schedule_many(tasks)
+    results['reschedule_tasks_seconds'], _ = await timed_async(bot.reschedule_tasks())
+    results['remaining_tasks'] = len(bot.scheduler)
+
+    await bot.close()
+    return results
+
+def bench_persistence(size):
+    guild_channels = {next_id(): [next_id() for _ in range(CHANNELS_PER_GUILD)] for _ in range(GUILD_COUNT)}
+    tasks = make_tasks(size, guild_channels, datetime.now(timezone.utc))
+    results = {}
+
+    json_storage = JsonStorage()
+    results['json_save_seconds'], _ = timed(json_storage.save_tasks, tasks)
+    results['json_file_bytes'] = os.path.getsize(json_storage.journal.snapshot_file)
+    json_storage.close()
+    json_storage = JsonStorage()
+    results['json_load_seconds'], loaded = timed(json_storage.load_tasks)
+    results['json_loaded_tasks'] = sum(len(guild_tasks) for guild_tasks in loaded.values())
+    json_storage.close()
+    json_storage = JsonStorage()
+    results['json_horizon_load_seconds'], loaded = timed(json_storage.load_tasks, 3600)
+    results['json_horizon_loaded_tasks'] = sum(len(guild_tasks) for guild_tasks in loaded.values())
+    json_storage.close()
+
+    results['json_torn_journal_tasks'] = check_torn_journal(guild_channels)
+
+    sqlite_storage = SQLiteStorage()
+    results['sqlite_save_seconds'], _ = timed(sqlite_storage.save_tasks, tasks)
+    results['sqlite_file_bytes'] = sum(sqlite_storage.file_sizes().values())
+    results['sqlite_load_seconds'], loaded = timed(sqlite_storage.load_tasks)
+    results['sqlite_loaded_tasks'] = sum(len(guild_tasks) for guild_tasks in loaded.values())
+    sqlite_storage.close()
+    return results
+
+def append_tasks(storage, tasks, count, guild_channels):
+    new_tasks = make_tasks(count, guild_channels, datetime.now(timezone.utc))
+    next_task_id = storage.max_task_id() + 1
+    added = []
+    for guild_id, guild_tasks in new_tasks.items():
+        for task in guild_tasks:
+            task['id'] = next_task_id
+            next_task_id += 1
+            tasks.setdefault(guild_id, []).append(task)
+            added.append((guild_id, task))
+    storage.record_tasks(tasks, added=added)
+
+def check_torn_journal(guild_channels):
+    """Tear the journal's last record as a crash would, append more, and check nothing after the tear is lost."""
+    json_storage = JsonStorage()
+    tasks = json_storage.load_tasks()
+    append_tasks(json_storage, tasks, 3, guild_channels)
+    json_storage.close()
+    with open(json_storage.journal.journal_file, 'a') as file:
+        file.write('{"op":"add","guild":"')
+
+    json_storage = JsonStorage()
+    tasks = json_storage.load_tasks()
+    append_tasks(json_storage, tasks, 3, guild_channels)
+    expected = sum(len(guild_tasks) for guild_tasks in tasks.values())
+    json_storage.close()
+
+    json_storage = JsonStorage()
+    loaded = sum(len(guild_tasks) for guild_tasks in json_storage.load_tasks().values())
+    json_storage.close()
+    if loaded != expected:
+        raise RuntimeError(f"Reloaded {loaded} task(s) after a torn journal record, expected {expected}.")
+    return loaded
+
+def run_in_scratch_directory(function, *args):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            return function(*args)
+        finally:
+            os.chdir(cwd)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's hot paths against fake Discord objects.")
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="comma separated task counts")
+    parser.add_argument('--messages', type=int, default=2000, help="messages per handle_message run")
+    parser.add_argument('--fanouts', default='1,5,25', help="comma separated webhook copies per edited message")
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    fanouts = [int(fanout) for fanout in args.fanouts.split(',')]
+
+    # The bot reports through print, keep stdout for the JSON results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_benchmarks(sizes, args.messages, fanouts)
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+def run_benchmarks(sizes, message_count, fanouts):
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'due_fraction': DUE_FRACTION,
+        },
+        'handle_message': run_in_scratch_directory(asyncio.run, bench_handle_message(message_count)),
+        'edit_fanout': run_in_scratch_directory(asyncio.run, bench_edit_fanout(message_count // 10, fanouts)),
+        'tasks': {},
+        'persistence': {},
+    }
+    for size in sizes:
+        print(f"Running task benchmarks with {size} tasks...")
+        results['tasks'][str(size)] = run_in_scratch_directory(asyncio.run, bench_tasks(size))
+        results['persistence'][str(size)] = run_in_scratch_directory(bench_persistence, size)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import ELENORA_BOT_ID, FRIENDLY_BOT_ID, parse_gametime
+
+ELENORA_DESCRIPTION = (
+    "**Raid: Vault of Glass**\n"
+    "Sign up below and bring your best loadout.\n"
+    "20:30 10/18/2026 (gametime)\n"
+    "Leader: someone\n" + "Participants: a, b, c, d, e, f\n" * 5
+)
+FRIENDLY_DESCRIPTION = (
+    "Starts at `2026-10-18 20:30` sharp, be on time.\n" + "Participants: a, b, c, d, e, f\n" * 5
+)
+
+def inline_elenora(description):
+    gametime_index = description.find("(gametime)")
+    datetime_str = description[:gametime_index].strip().split("\n")[-1].strip()
+    return datetime.strptime(datetime_str, "%H:%M %m/%d/%Y").replace(tzinfo=timezone.utc)
+
+def inline_friendly(description):
+    start = description.find("`") + 1
+    end = description.find("`", start)
+    return datetime.strptime(description[start:end], "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+
+def bench(name, function, number):
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    print(f"{name:<28} {seconds / number * 1e6:8.2f} us/call")
+
+if __name__ == "__main__":
+    number = 20000
+
+    assert parse_gametime(ELENORA_BOT_ID, ELENORA_DESCRIPTION) == inline_elenora(ELENORA_DESCRIPTION)
+    assert parse_gametime(FRIENDLY_BOT_ID, FRIENDLY_DESCRIPTION) == inline_friendly(FRIENDLY_DESCRIPTION)
+
+    bench("elenora inline strptime", lambda: inline_elenora(ELENORA_DESCRIPTION), number)
+    bench("elenora registry parser", lambda: parse_gametime(ELENORA_BOT_ID, ELENORA_DESCRIPTION), number)
+    bench("backtick inline strptime", lambda: inline_friendly(FRIENDLY_DESCRIPTION), number)
+    bench("backtick registry parser", lambda: parse_gametime(FRIENDLY_BOT_ID, FRIENDLY_DESCRIPTION), number)
@@ -0,0 +1,154 @@
+import os
+import sys
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from main import pinBot, intents
+
+ids = itertools.count(1_100_000_000_000_000_000)
+
+def next_id():
+    return next(ids)
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+class FakeGuild:
+    def __init__(self, guild_id, name="Benchmark Guild"):
+        self.id = guild_id
+        self.name = name
+
+class FakeButton:
+    def __init__(self, label):
+        self.label = label
+
+class FakeActionRow:
+    def __init__(self, *labels):
+        self.children = [FakeButton(label) for label in labels]
+
+class FakeThread(discord.Thread):
+    # Subclassed only so isinstance checks against discord.Thread pass
+    def __init__(self, thread_id, name="thread"):
+        self.id = thread_id
+        self.name = name
+
+    async def edit(self, name=None):
+        self.name = name
+
+    async def send(self, content):
+        return FakePartialMessage(self, next_id())
+
+    async def delete(self):
+        pass
+
+class FakePartialMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def pin(self):
+        self.channel.calls['pin'] += 1
+
+    async def unpin(self):
+        self.channel.calls['unpin'] += 1
+
+    async def delete(self):
+        self.channel.calls['delete'] += 1
+
+    async def publish(self):
+        self.channel.calls['publish'] += 1
+
+class FakeChannel:
+    """Text channel stand-in that answers every API call at once and counts them."""
+
+    def __init__(self, channel_id, guild, news=False):
+        self.id = channel_id
+        self.guild = guild
+        self.news = news
+        self.threads = {}
+        self.calls = {'pin': 0, 'unpin': 0, 'delete': 0, 'publish': 0, 'pins': 0}
+
+    def is_news(self):
+        return self.news
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self, message_id)
+
+    def get_thread(self, thread_id):
+        return self.threads.get(thread_id)
+
+    async def pins(self):
+        self.calls['pins'] += 1
+        return []
+
+    async def delete_messages(self, messages):
+        self.calls['delete'] += len(messages)
+
+class FakeMessage(FakePartialMessage):
+    def __init__(self, channel, author_id, description=None, buttons=(), content="", message_id=None):
+        super().__init__(channel, message_id or next_id())
+        self.guild = channel.guild
+        self.author = FakeUser(author_id)
+        self.content = content
+        self.role_mentions = []
+        self.thread = None
+        self.embeds = [discord.Embed(title="Raid", description=description)] if description is not None else []
+        self.components = [FakeActionRow(*buttons)] if buttons else []
+        self.jump_url = f"https://discord.com/channels/{self.guild.id}/{channel.id}/{self.id}"
+
+    async def create_thread(self, name):
+        thread = FakeThread(next_id(), name)
+        self.channel.threads[thread.id] = thread
+        self.thread = thread
+        return thread
+
+class FakeHttpClient:
+    """Stands in for HttpClient: webhook posts and edits succeed immediately."""
+
+    def __init__(self, channel_id=None):
+        self.channel_id = channel_id
+        self.calls = {'POST': 0, 'PATCH': 0}
+
+    async def post(self, url, json=None, params=None):
+        self.calls['POST'] += 1
+        response = {'id': str(next_id())}
+        if self.channel_id is not None:
+            response['channel_id'] = str(self.channel_id)
+        return response
+
+    async def patch(self, url, json=None, params=None):
+        self.calls['PATCH'] += 1
+        return {}
+
+    async def close(self):
+        pass
+
+class BenchBot(pinBot):
+    """The real bot with its Discord connection replaced by the fakes above.
+
+    Create it from inside a scratch directory, it reads and writes its data
+    files in the working directory like the real bot does.
+    """
+
+    def __init__(self):
+        super().__init__(command_prefix=None, intents=intents)
+        self.fake_channels = {}
+        self.http_client = FakeHttpClient()
+        # Pacing is Discord's concern, the benchmarks measure the bot's own overhead
+        self.executor.unpin_rate = 1_000_000
+
+    def add_channel(self, channel):
+        self.fake_channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.fake_channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        return FakeThread(channel_id)
+
+    def is_ready(self):
+        return True
@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from http_client import HttpClient
+from mock_discord import MockDiscord
+
+ids = itertools.count(1_300_000_000_000_000_000)
+
+async def run_pin_load(http, channel_ids, duration):
+    """Pin and unpin fresh messages in every channel for `duration` seconds through discord.py."""
+    counts = {'pins': 0, 'unpins': 0, 'errors': 0}
+    deadline = time.perf_counter() + duration
+
+    async def channel_loop(channel_id):
+        while time.perf_counter() < deadline:
+            message_id = next(ids)
+            try:
+                await http.pin_message(channel_id, message_id)
+                counts['pins'] += 1
+                await http.unpin_message(channel_id, message_id)
+                counts['unpins'] += 1
+            except discord.HTTPException:
+                counts['errors'] += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(channel_loop(channel_id) for channel_id in channel_ids))
+    seconds = time.perf_counter() - start_time
+    counts.update({'seconds': seconds, 'requests_per_second': (counts['pins'] + counts['unpins']) / seconds})
+    return counts
+
+async def run_webhook_fanout(client, webhook_urls, message_count):
+    """Post every message to every webhook and edit each copy once, like a forwarded sign-up post."""
+    counts = {'posts': 0, 'edits': 0, 'errors': 0}
+
+    async def forward(url):
+        try:
+            response = await client.post(url, json={'content': 'load test'}, params={'wait': 'true'})
+            counts['posts'] += 1
+            await client.patch(f"{url}/messages/{response['id']}", json={'content': 'edited'})
+            counts['edits'] += 1
+        except Exception:
+            counts['errors'] += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(forward(url) for _ in range(message_count) for url in webhook_urls))
+    seconds = time.perf_counter() - start_time
+    counts.update({'seconds': seconds, 'requests_per_second': (counts['posts'] + counts['edits']) / seconds})
+    return counts
+
+async def mock_request(base_url, method, path, payload=None):
+    async with aiohttp.ClientSession() as session:
+        async with session.request(method, base_url.split('/api')[0] + path, json=payload) as response:
+            return await response.json() if response.status == 200 else None
+
+async def run(args):
+    mock = None
+    base_url = args.base_url
+    if base_url is None:
+        mock = MockDiscord(args.latency, args.jitter, args.failure_rate, args.limit, args.window, args.global_limit)
+        await mock.start(port=args.port)
+        base_url = f"http://127.0.0.1:{args.port}/api/v10"
+    discord.http.Route.BASE = base_url
+
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    await http.static_login('load-test')
+    client = HttpClient(base_url=base_url)
+    channel_ids = [next(ids) for _ in range(args.channels)]
+    webhook_urls = [f"https://discord.com/api/webhooks/{next(ids)}/token" for _ in range(args.webhooks)]
+
+    if args.storm:
+        # Start the storm partway in, so both phases see the clients recover from it
+        async def start_storm():
+            await asyncio.sleep(args.duration / 2)
+            await mock_request(base_url, 'POST', '/_mock/storm', {'seconds': args.storm})
+        asyncio.create_task(start_storm())
+
+    results = {
+        'config': vars(args),
+        'pin_unpin': await run_pin_load(http, channel_ids, args.duration),
+        'webhook_fanout': await run_webhook_fanout(client, webhook_urls, args.messages),
+        'webhook_client_rate_limited': sum(client.scheduler.rate_limited.values()),
+        'server': await mock_request(base_url, 'GET', '/_mock/stats'),
+    }
+
+    await client.close()
+    await http.close()
+    if mock is not None:
+        await mock.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive sustained pin/unpin and webhook traffic against the mock Discord API.")
+    parser.add_argument('--base-url', help="API base URL of an already running mock, one is started in-process otherwise")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--duration', type=float, default=10, help="seconds of pin/unpin traffic")
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--webhooks', type=int, default=10)
+    parser.add_argument('--messages', type=int, default=20, help="messages forwarded to every webhook")
+    parser.add_argument('--storm', type=float, default=0, help="seconds of 429 storm to trigger halfway through")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--window', type=float, default=2)
+    parser.add_argument('--global-limit', type=int, default=50)
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    output = json.dumps(asyncio.run(run(args)), indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import itertools
+from aiohttp import web
+
+API_PREFIXES = ('/api', '/api/v9', '/api/v10')
+SNOWFLAKE_START = 1_200_000_000_000_000_000
+
+# Path segments that are not major parameters are folded out of the bucket key, like Discord does
+minor_parameter_pattern = re.compile(r"/(messages|pins|members|threads)/\d+")
+
+def json_response(data, status=200, headers=None):
+    # discord.py only parses bodies whose content type is exactly application/json, without a charset
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type='application/json')
+
+class RateLimitBucket:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0
+
+    def is_exhausted(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        return self.remaining <= 0
+
+class MockDiscord:
+    """Local stand-in for the Discord REST endpoints the bot calls.
+
+    Every request can be delayed by `latency` +/- `jitter` seconds and fail
+    with a 5xx at `failure_rate`. Each route and major parameter gets its own
+    fixed-window bucket of `limit` requests per `window` seconds, on top of a
+    global limit per second, and responses carry the same X-RateLimit headers
+    Discord sends. POST /_mock/storm answers everything with 429s for a while.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.02, failure_rate=0.0, limit=5, window=2, global_limit=50):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.limit = limit
+        self.window = window
+        self.global_bucket = RateLimitBucket(global_limit, 1)
+        self.buckets = {}
+        self.storm_until = 0
+        self.storm_global = False
+        self.ids = itertools.count(SNOWFLAKE_START)
+        self.stats = {}
+        self.runner = None
+
+    def next_id(self):
+        return str(next(self.ids))
+
+    def count(self, route, outcome):
+        route_stats = self.stats.setdefault(route, {'requests': 0, 'rate_limited': 0, 'failed': 0})
+        route_stats[outcome] += 1
+
+    def rate_limit_response(self, bucket_hash, retry_after, is_global):
+        headers = {'Via': '1.1 google', 'Retry-After': str(math.ceil(retry_after)),
+                   'X-RateLimit-Scope': 'global' if is_global else 'user'}
+        if is_global:
+            headers['X-RateLimit-Global'] = 'true'
+        else:
+            headers.update({'X-RateLimit-Limit': str(self.limit), 'X-RateLimit-Remaining': '0',
+                            'X-RateLimit-Reset': f"{time.time() + retry_after:.3f}",
+                            'X-RateLimit-Reset-After': f"{retry_after:.3f}", 'X-RateLimit-Bucket': bucket_hash})
+        body = {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3), 'global': is_global}
+        return json_response(body, status=429, headers=headers)
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        if request.path.startswith('/_mock/'):
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        route = f"{request.method} {resource.canonical if resource else request.path}"
+        bucket_key = request.method + minor_parameter_pattern.sub(r"/\1/{id}", request.path)
+        bucket_hash = hashlib.sha1(route.encode()).hexdigest()[:16]
+        self.count(route, 'requests')
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+
+        now = time.monotonic()
+        if now < self.storm_until:
+            self.count(route, 'rate_limited')
+            return self.rate_limit_response(bucket_hash, min(self.storm_until - now, 1), self.storm_global)
+
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self.buckets[bucket_key] = RateLimitBucket(self.limit, self.window)
+        if bucket.is_exhausted(now):
+            self.count(route, 'rate_limited')
+            return self.rate_limit_response(bucket_hash, bucket.reset_at - now, False)
+        if self.global_bucket.is_exhausted(now):
+            self.count(route, 'rate_limited')
+            return self.rate_limit_response(bucket_hash, self.global_bucket.reset_at - now, True)
+        bucket.remaining -= 1
+        self.global_bucket.remaining -= 1
+
+        if random.random() < self.failure_rate:
+            self.count(route, 'failed')
+            return json_response({'message': '500: Internal Server Error', 'code': 0}, status=500,
+                                     headers={'Via': '1.1 google'})
+
+        response = await handler(request)
+        response.headers.update({'Via': '1.1 google', 'X-RateLimit-Limit': str(bucket.limit),
+                                 'X-RateLimit-Remaining': str(bucket.remaining),
+                                 'X-RateLimit-Reset': f"{time.time() + bucket.reset_at - now:.3f}",
+                                 'X-RateLimit-Reset-After': f"{bucket.reset_at - now:.3f}",
+                                 'X-RateLimit-Bucket': bucket_hash})
+        return response
+
+    def message(self, channel_id, message_id=None, content=""):
+        return {'id': message_id or self.next_id(), 'channel_id': str(channel_id), 'type': 0, 'content': content,
+                'author': {'id': self.next_id(), 'username': 'mock', 'discriminator': '0000', 'avatar': None},
+                'embeds': [], 'attachments': [], 'mentions': [], 'mention_roles': [], 'pinned': False,
+                'mention_everyone': False, 'tts': False, 'timestamp': '2026-01-01T00:00:00+00:00',
+                'edited_timestamp': None, 'flags': 0, 'components': []}
+
+    def thread(self, thread_id, parent_id, name="thread"):
+        return {'id': str(thread_id), 'type': 11, 'guild_id': str(SNOWFLAKE_START), 'parent_id': str(parent_id),
+                'owner_id': str(SNOWFLAKE_START), 'name': name, 'last_message_id': None, 'rate_limit_per_user': 0,
+                'message_count': 0, 'member_count': 1, 'flags': 0,
+                'thread_metadata': {'archived': False, 'auto_archive_duration': 1440, 'locked': False,
+                                    'archive_timestamp': '2026-01-01T00:00:00+00:00'}}
+
+    async def get_current_user(self, request):
+        return json_response({'id': str(SNOWFLAKE_START), 'username': 'Pin Bot', 'discriminator': '0',
+                                  'global_name': None, 'avatar': None, 'bot': True, 'flags': 0})
+
+    async def get_application(self, request):
+        user = {'id': str(SNOWFLAKE_START), 'username': 'owner', 'discriminator': '0', 'avatar': None}
+        return json_response({'id': str(SNOWFLAKE_START), 'name': 'Pin Bot', 'icon': None, 'description': '',
+                                  'bot_public': True, 'bot_require_code_grant': False, 'owner': user,
+                                  'verify_key': '', 'flags': 0})
+
+    async def get_gateway(self, request):
+        # Only REST is mocked, the bot still connects to the real gateway
+        return json_response({'url': 'wss://gateway.discord.gg', 'shards': 1,
+                                  'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0,
+                                                          'max_concurrency': 1}})
+
+    async def sync_commands(self, request):
+        return json_response([])
+
+    async def execute_webhook(self, request):
+        payload = await request.json()
+        message = self.message(request.match_info['webhook_id'], content=payload.get('content') or "")
+        message['webhook_id'] = request.match_info['webhook_id']
+        if request.query.get('wait') == 'true':
+            return json_response(message)
+        return web.Response(status=204)
+
+    async def edit_webhook_message(self, request):
+        await request.json()
+        return json_response(self.message(request.match_info['webhook_id'], request.match_info['message_id']))
+
+    async def get_webhook(self, request):
+        webhook_id = request.match_info['webhook_id']
+        return json_response({'id': webhook_id, 'type': 1, 'channel_id': webhook_id, 'guild_id': str(SNOWFLAKE_START),
+                                  'name': 'mock webhook', 'avatar': None, 'application_id': None})
+
+    async def get_pins(self, request):
+        return json_response([])
+
+    async def no_content(self, request):
+        return web.Response(status=204)
+
+    async def create_thread(self, request):
+        payload = await request.json()
+        return json_response(self.thread(self.next_id(), request.match_info['channel_id'], payload.get('name', 'thread')))
+
+    async def get_channel(self, request):
+        return json_response(self.thread(request.match_info['channel_id'], SNOWFLAKE_START))
+
+    async def crosspost(self, request):
+        return json_response(self.message(request.match_info['channel_id'], request.match_info['message_id']))
+
+    async def start_storm(self, request):
+        payload = await request.json() if request.can_read_body else {}
+        self.storm_until = time.monotonic() + float(payload.get('seconds', 10))
+        self.storm_global = bool(payload.get('global', False))
+        return json_response({'storm_seconds': payload.get('seconds', 10), 'global': self.storm_global})
+
+    async def get_stats(self, request):
+        return json_response(self.stats)
+
+    async def reset_stats(self, request):
+        self.stats = {}
+        self.buckets = {}
+        self.storm_until = 0
+        return web.Response(status=204)
+
+    def create_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        routes = [
+            ('GET', '/users/@me', self.get_current_user),
+            ('GET', '/oauth2/applications/@me', self.get_application),
+            ('GET', '/gateway', self.get_gateway),
+            ('GET', '/gateway/bot', self.get_gateway),
+            ('PUT', '/applications/{application_id}/commands', self.sync_commands),
+            ('PUT', '/applications/{application_id}/guilds/{guild_id}/commands', self.sync_commands),
+            ('POST', '/webhooks/{webhook_id}/{token}', self.execute_webhook),
+            ('PATCH', '/webhooks/{webhook_id}/{token}/messages/{message_id}', self.edit_webhook_message),
+            ('GET', '/webhooks/{webhook_id}', self.get_webhook),
+            ('GET', '/channels/{channel_id}/pins', self.get_pins),
+            ('PUT', '/channels/{channel_id}/pins/{message_id}', self.no_content),
+            ('DELETE', '/channels/{channel_id}/pins/{message_id}', self.no_content),
+            ('POST', '/channels/{channel_id}/messages/{message_id}/threads', self.create_thread),
+            ('POST', '/channels/{channel_id}/messages/{message_id}/crosspost', self.crosspost),
+            ('DELETE', '/channels/{channel_id}/messages/{message_id}', self.no_content),
+            ('POST', '/channels/{channel_id}/messages/bulk-delete', self.no_content),
+            ('GET', '/channels/{channel_id}', self.get_channel),
+            ('PATCH', '/channels/{channel_id}', self.get_channel),
+            ('DELETE', '/channels/{channel_id}', self.get_channel),
+        ]
+        for prefix in API_PREFIXES:
+            for method, path, handler in routes:
+                app.router.add_route(method, prefix + path, handler)
+        app.router.add_post('/_mock/storm', self.start_storm)
+        app.router.add_get('/_mock/stats', self.get_stats)
+        app.router.add_post('/_mock/reset', self.reset_stats)
+        return app
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def close(self):
+        await self.runner.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Discord REST API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.05, help="mean response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02, help="random spread around the delay in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument('--limit', type=int, default=5, help="requests per bucket window")
+    parser.add_argument('--window', type=float, default=2, help="bucket window in seconds")
+    parser.add_argument('--global-limit', type=int, default=50, help="requests per second across all routes")
+    args = parser.parse_args()
+
+    mock = MockDiscord(args.latency, args.jitter, args.failure_rate, args.limit, args.window, args.global_limit)
+    print(f"Serving the mock Discord API on http://{args.host}:{args.port}/api/v10")
+    web.run_app(mock.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import time
+
+class TTLCache:
+    """Small dict-backed cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.entries = {}
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return default
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import argparse
+import itertools
+import subprocess
+from dotenv import load_dotenv
+from storage import create_storage
+from functions import get_task_due_time
+from sent_messages import SentMessageIndex
+
+load_dotenv()
+
+def get_shard_id(guild_id, shard_count):
+    # The same formula Discord uses to route a guild to a shard
+    return (int(guild_id) >> 22) % shard_count
+
+def split_shards(shard_count, workers):
+    return [list(range(worker, shard_count, workers)) for worker in range(workers)]
+
+def filter_guilds(data, shard_count, shards):
+    return {guild_id: value for guild_id, value in data.items() if get_shard_id(guild_id, shard_count) in shards}
+
+def load_data(backend, data_dir):
+    storage = create_storage(backend, data_dir)
+    data = {
+        'monitored_channels': storage.load_monitored_channels(),
+        'settings': storage.load_settings(),
+        'webhooks': storage.load_webhooks(),
+        'tasks': storage.load_tasks(read_only=True),
+    }
+    storage.close()
+    return data
+
+def task_set(tasks):
+    return {(str(guild_id), task['id'], task['type'], task['channel_id'], task.get('message_id'),
+             task.get('thread_id'), get_task_due_time(task), task['retries'])
+            for guild_id, guild_tasks in tasks.items() for task in guild_tasks}
+
+def save_data(backend, data_dir, data):
+    storage = create_storage(backend, data_dir)
+    storage.save_monitored_channels(data['monitored_channels'])
+    storage.save_settings(data['settings'])
+    storage.save_webhooks(data['webhooks'])
+    storage.save_tasks(data['tasks'])
+    storage.close()
+
+def copy_sent_messages(source_dirs, worker_dir):
+    # Webhook copies are not kept per guild, so every worker gets all of them and edits keep being mirrored
+    index = SentMessageIndex(os.path.join(worker_dir, "sent_messages.db"))
+    for source_dir in source_dirs:
+        source_file = os.path.join(source_dir, "sent_messages.db")
+        if not os.path.exists(source_file):
+            continue
+        index.connection.execute("ATTACH DATABASE ? AS source", (source_file,))
+        with index.connection:
+            index.connection.execute("INSERT OR IGNORE INTO sent_messages SELECT * FROM source.sent_messages")
+        index.connection.execute("DETACH DATABASE source")
+    index.close()
+
+def partition_data(source_backend, backend, source_dirs, worker_dirs, shard_groups, shard_count):
+    """Merge the data of `source_dirs` and split it between the workers by the shard each guild is on."""
+    merged = {'monitored_channels': {}, 'settings': {}, 'webhooks': {}, 'tasks': {}}
+    for source_dir in source_dirs:
+        data = load_data(source_backend, source_dir)
+        for name, values in data.items():
+            merged[name].update(values)
+
+    # Each source numbered its tasks on its own, so the merged tasks are numbered again
+    task_ids = itertools.count(1)
+    for guild_tasks in merged['tasks'].values():
+        for task in guild_tasks:
+            task['id'] = next(task_ids)
+
+    guild_counts = {name: 0 for name in merged}
+    task_count = 0
+    for worker_dir, shards in zip(worker_dirs, shard_groups):
+        os.makedirs(worker_dir, exist_ok=True)
+        worker_data = {name: filter_guilds(values, shard_count, shards) for name, values in merged.items()}
+        save_data(backend, worker_dir, worker_data)
+        copy_sent_messages(source_dirs, worker_dir)
+
+        # Read the worker back, a worker must never start from data other than the data it was given
+        saved = load_data(backend, worker_dir)
+        if task_set(saved['tasks']) != task_set(worker_data['tasks']):
+            raise RuntimeError(f"The tasks saved to {worker_dir} do not match the partitioned tasks.")
+        for name in merged:
+            guild_counts[name] += len(saved[name])
+        task_count += sum(len(guild_tasks) for guild_tasks in saved['tasks'].values())
+
+    # Every guild and task of the sources ends up on exactly one worker
+    for name, values in merged.items():
+        if guild_counts[name] != len(values):
+            raise RuntimeError(f"The workers hold {guild_counts[name]} guild(s) of {name}, the sources {len(values)}.")
+    if task_count != sum(len(guild_tasks) for guild_tasks in merged['tasks'].values()):
+        raise RuntimeError("The workers do not hold every task of the sources.")
+
+def get_worker_dirs(cluster_dir, layout):
+    # Layouts written before data was staged kept the workers directly in the cluster directory
+    return layout.get('worker_dirs') or [os.path.join(cluster_dir, f"worker-{worker}") for worker in range(layout['workers'])]
+
+def write_layout(layout_file, layout):
+    temp_file = f"{layout_file}.tmp"
+    with open(temp_file, 'w') as file:
+        json.dump(layout, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, layout_file)
+
+def remove_stale_layouts(cluster_dir, generation):
+    # Left behind by a repartition that crashed before, or right after, switching layout.json over
+    for name in os.listdir(cluster_dir):
+        if name.startswith("layout-") and name != f"layout-{generation}":
+            shutil.rmtree(os.path.join(cluster_dir, name), ignore_errors=True)
+
+def prepare_workers(backend, cluster_dir, workers, shard_count):
+    """Create one data directory per worker, repartitioning the data whenever the layout changes.
+
+    A new layout is written to directories of its own and checked against its
+    sources. layout.json is then switched over to it in one rename, so a crash
+    at any point leaves the workers on either the old data or the new data.
+    """
+    layout_file = os.path.join(cluster_dir, "layout.json")
+    layout = {'backend': backend, 'workers': workers, 'shard_count': shard_count}
+    shard_groups = split_shards(shard_count, workers)
+
+    try:
+        with open(layout_file, 'r') as file:
+            previous_layout = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous_layout = None
+
+    if previous_layout is not None and all(previous_layout.get(key) == value for key, value in layout.items()):
+        remove_stale_layouts(cluster_dir, previous_layout.get('generation', 0))
+        return get_worker_dirs(cluster_dir, previous_layout), shard_groups
+
+    if previous_layout is None:
+        # First start: seed the workers from the single process data next to main.py
+        source_dirs = ["."]
+        generation = 1
+    else:
+        source_dirs = get_worker_dirs(cluster_dir, previous_layout)
+        generation = previous_layout.get('generation', 0) + 1
+    staging_dir = os.path.join(cluster_dir, f"layout-{generation}")
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    worker_dirs = [os.path.join(staging_dir, f"worker-{worker}") for worker in range(workers)]
+
+    print(f"Partitioning data from {', '.join(source_dirs)} over {workers} worker(s) and {shard_count} shard(s).")
+    source_backend = previous_layout['backend'] if previous_layout else backend
+    partition_data(source_backend, backend, source_dirs, worker_dirs, shard_groups, shard_count)
+
+    layout.update({'generation': generation, 'worker_dirs': worker_dirs})
+    write_layout(layout_file, layout)
+
+    # The old directories stay the source of truth until layout.json points away from them
+    if previous_layout is not None:
+        for source_dir in source_dirs:
+            shutil.rmtree(source_dir, ignore_errors=True)
+        remove_stale_layouts(cluster_dir, generation)
+    return worker_dirs, shard_groups
+
+def start_worker(worker, worker_dir, shards, shard_count):
+    env = dict(os.environ)
+    env.update({'data_dir': worker_dir, 'shard_count': str(shard_count), 'shard_ids': ','.join(map(str, shards))})
+    if os.getenv("metrics_port"):
+        env['metrics_port'] = str(int(os.getenv("metrics_port")) + worker)
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    print(f"Starting worker {worker} with shards {shards}.")
+    return subprocess.Popen([sys.executable, main_file], env=env)
+
+def run_cluster(workers, shard_count, cluster_dir, backend, restart_delay=5):
+    worker_dirs, shard_groups = prepare_workers(backend, cluster_dir, workers, shard_count)
+    processes = [start_worker(worker, worker_dirs[worker], shard_groups[worker], shard_count)
+                 for worker in range(workers)]
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        time.sleep(1)
+        for worker, process in enumerate(processes):
+            if process.poll() is not None and not stopping:
+                print(f"Worker {worker} exited with code {process.returncode}, restarting in {restart_delay}s.")
+                time.sleep(restart_delay)
+                processes[worker] = start_worker(worker, worker_dirs[worker], shard_groups[worker], shard_count)
+
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes:
+        process.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bot as several worker processes, each owning a set of shards.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, help="total shard count, defaults to one per worker")
+    parser.add_argument('--data-dir', default="cluster", help="where the per-worker data directories are kept")
+    args = parser.parse_args()
+
+    shard_count = args.shards or args.workers
+    if shard_count < args.workers:
+        parser.error("--shards must be at least --workers")
+    run_cluster(args.workers, shard_count, args.data_dir, os.getenv("storage", "json"))
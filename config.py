@@ -0,0 +1,288 @@
+import asyncio
+from types import MappingProxyType
+from collections import namedtuple
+
+CONFIG_NAMES = ('monitored_channels', 'settings', 'webhooks')
+
+ConfigSnapshot = namedtuple('ConfigSnapshot', ['version', 'monitored_channels', 'settings', 'webhooks',
+                                               'guild_versions'])
+
+def get_guild_config(config, guild_id):
+    return (config.monitored_channels.get(guild_id), config.settings.get(str(guild_id)), config.webhooks.get(guild_id))
+
+def get_guild_versions(config, previous):
+    """The version each guild's config last changed at, carried over from `previous` for untouched guilds."""
+    guild_ids = set(config.monitored_channels) | set(config.webhooks) | {int(guild_id) for guild_id in config.settings}
+    versions = {}
+    for guild_id in guild_ids:
+        if (previous is not None and guild_id in previous.guild_versions
+                and get_guild_config(previous, guild_id) == get_guild_config(config, guild_id)):
+            versions[guild_id] = previous.guild_versions[guild_id]
+        else:
+            versions[guild_id] = config.version
+    return MappingProxyType(versions)
+
+def freeze_config(version, monitored_channels, settings, webhooks, previous=None):
+    config = ConfigSnapshot(
+        version,
+        MappingProxyType({guild_id: tuple(channels) for guild_id, channels in monitored_channels.items()}),
+        MappingProxyType({guild_id: MappingProxyType(dict(guild_settings))
+                          for guild_id, guild_settings in settings.items()}),
+        MappingProxyType({guild_id: tuple(urls) for guild_id, urls in webhooks.items()
+                          if isinstance(urls, list)}),
+        None
+    )
+    return config._replace(guild_versions=get_guild_versions(config, previous))
+
+def refreeze(frozen, key, value, freeze):
+    if value is None:
+        frozen.pop(key, None)
+    else:
+        frozen[key] = freeze(value)
+
+def update_config(config, version, guild_ids, monitored_channels, settings, webhooks):
+    """A copy of `config` at `version` with only the given guilds frozen again from the live mappings."""
+    channel_map = dict(config.monitored_channels)
+    settings_map = dict(config.settings)
+    webhook_map = dict(config.webhooks)
+    guild_versions = dict(config.guild_versions)
+    for guild_id in guild_ids:
+        refreeze(channel_map, guild_id, monitored_channels.get(guild_id), tuple)
+        refreeze(settings_map, str(guild_id), settings.get(str(guild_id)),
+                 lambda guild_settings: MappingProxyType(dict(guild_settings)))
+        urls = webhooks.get(guild_id)
+        refreeze(webhook_map, guild_id, urls if isinstance(urls, list) else None, tuple)
+        guild_versions[guild_id] = version
+    return ConfigSnapshot(version, MappingProxyType(channel_map), MappingProxyType(settings_map),
+                          MappingProxyType(webhook_map), MappingProxyType(guild_versions))
+
+class ConfigWatcher:
+    """Reloads channels, settings and webhooks only when their storage changes.
+
+    A cheap signature (mtime and size for files) is compared first, and the
+    content hash only when the signature moved, so an untouched config costs a
+    stat per check. Every change publishes a new immutable ConfigSnapshot on
+    the bot with a higher version number, along with the version each guild's
+    own config last changed at.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.version = 0
+        self.signatures = {}
+        self.digests = {}
+
+    def track(self, name):
+        self.signatures[name] = self.bot.storage.config_signature(name)
+        self.digests[name] = self.bot.storage.config_digest(name)
+
+    def track_all(self):
+        for name in CONFIG_NAMES:
+            self.track(name)
+        self.publish()
+
+    def publish(self, guild_ids=None):
+        self.version += 1
+        if guild_ids is not None and self.bot.config is not None:
+            # Only the guilds that changed need freezing again
+            self.bot.config = update_config(self.bot.config, self.version, guild_ids, self.bot.monitored_channels,
+                                            self.bot.settings, self.bot.webhooks)
+        else:
+            self.bot.config = freeze_config(self.version, self.bot.monitored_channels,
+                                            self.bot.settings, self.bot.webhooks, self.bot.config)
+        return self.bot.config
+
+    def note_saved(self, name):
+        # The bot's own write is already in memory, so only remember it instead of reloading it
+        self.track(name)
+        self.publish()
+
+    def check(self):
+        changed = []
+        for name in CONFIG_NAMES:
+            # Storage is behind memory until the config service has written its changes out
+            if self.bot.config_service.is_dirty(name):
+                continue
+            signature = self.bot.storage.config_signature(name)
+            if signature == self.signatures.get(name):
+                continue
+            self.signatures[name] = signature
+
+            digest = self.bot.storage.config_digest(name)
+            if digest == self.digests.get(name):
+                continue
+            self.digests[name] = digest
+
+            data = self.bot.storage.load_config(name)
+            if isinstance(data, dict):
+                changed.append((name, data))
+
+        if not changed:
+            return False
+
+        # Swap every changed mapping in before publishing so readers never see a half-applied reload
+        for name, data in changed:
+            setattr(self.bot, name, data)
+        self.publish()
+        return True
+
+class ConfigService:
+    """The one way the settings views read and change channels, settings and webhooks.
+
+    Reads come from the current ConfigSnapshot. Changes are applied to the
+    bot's in-memory config and published straight away; the guilds they touch
+    are marked dirty and written out together `flush_delay` seconds later from
+    a worker thread, so a burst of clicks costs one write and a click never
+    waits on storage.
+    """
+
+    def __init__(self, bot, flush_delay=2):
+        self.bot = bot
+        self.flush_delay = flush_delay
+        self.dirty = {}
+        self.writing = set()
+        self.flush_task = None
+        self.flush_now = asyncio.Event()
+
+    def get_channels(self, guild_id):
+        return self.bot.config.monitored_channels.get(guild_id, ())
+
+    def get_settings(self, guild_id):
+        return self.bot.config.settings.get(str(guild_id), {})
+
+    def get_webhooks(self, guild_id):
+        return self.bot.config.webhooks.get(guild_id, ())
+
+    def changed(self, name, guild_id):
+        guild_id = int(guild_id)
+        self.dirty.setdefault(name, set()).add(guild_id)
+        self.bot.config_watcher.publish([guild_id])
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_later())
+
+    def is_dirty(self, name):
+        return name in self.dirty or name in self.writing
+
+    def add_channel(self, guild_id, channel_id):
+        channels = self.bot.monitored_channels.setdefault(guild_id, [])
+        if channel_id in channels:
+            return False
+        channels.append(channel_id)
+        self.changed('monitored_channels', guild_id)
+        return True
+
+    def remove_channels(self, guild_id, channel_ids):
+        channels = self.bot.monitored_channels.get(guild_id)
+        if not channels or not set(channel_ids) & set(channels):
+            return False
+        self.bot.monitored_channels[guild_id] = [channel_id for channel_id in channels if channel_id not in channel_ids]
+        self.changed('monitored_channels', guild_id)
+        return True
+
+    def update_settings(self, guild_id, **changes):
+        self.bot.settings.setdefault(str(guild_id), {}).update(changes)
+        self.changed('settings', guild_id)
+
+    def remove_setting(self, guild_id, key):
+        guild_settings = self.bot.settings.get(str(guild_id))
+        if not guild_settings or key not in guild_settings:
+            return False
+        del guild_settings[key]
+        self.changed('settings', guild_id)
+        return True
+
+    def add_webhook(self, guild_id, url):
+        urls = self.bot.webhooks.setdefault(guild_id, [])
+        if url in urls:
+            return False
+        urls.append(url)
+        self.changed('webhooks', guild_id)
+        return True
+
+    def remove_webhooks(self, guild_id):
+        if not self.bot.webhooks.get(guild_id):
+            return False
+        del self.bot.webhooks[guild_id]
+        self.changed('webhooks', guild_id)
+        return True
+
+    def copy_config(self, name):
+        data = getattr(self.bot, name)
+        if name == 'settings':
+            return {guild_id: dict(guild_settings) for guild_id, guild_settings in data.items()}
+        return {guild_id: list(values) for guild_id, values in data.items() if isinstance(values, list)}
+
+    async def flush_later(self):
+        # Changes made while a write is running go out with the next round
+        while self.dirty:
+            try:
+                await asyncio.wait_for(self.flush_now.wait(), self.flush_delay)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        dirty, self.dirty = self.dirty, {}
+        for name, guild_ids in dirty.items():
+            # Copy on the event loop so the worker thread never sees a half-applied change
+            data = self.copy_config(name)
+            self.writing.add(name)
+            try:
+                with self.bot.metrics.storage_seconds.time(operation=f'flush_{name}'):
+                    await asyncio.to_thread(self.bot.storage.save_config, name, data, guild_ids)
+                self.bot.config_watcher.track(name)
+            except Exception as e:
+                print(f"Failed to write {name}: {e}")
+            finally:
+                self.writing.discard(name)
+
+    async def close(self):
+        # Write out whatever is still waiting on the timer before the bot goes away
+        if self.flush_task is not None and not self.flush_task.done():
+            self.flush_now.set()
+            await self.flush_task
+
+class SettingsRenderer:
+    """Embed fields for /settings, rendered from the ConfigSnapshot.
+
+    Fields are cached per guild and rendered again only once that guild's
+    config version moves, so answering never touches storage and does not
+    depend on how many guilds the bot is in.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.fields = {}
+
+    def render_fields(self, guild_id):
+        config = self.bot.config
+        guild_settings = config.settings.get(str(guild_id), {})
+        unpin_time = guild_settings.get('unpin_time', '60')
+        thread_deletion_time = guild_settings.get('thread_deletion_time', '60')
+        force_thread_creation = guild_settings.get('force_thread_creation', 'False')
+        invite_link = guild_settings.get('invite_link', 'Not set')
+        webhook_urls = config.webhooks.get(guild_id)
+        webhook_link = webhook_urls[0] if webhook_urls else 'Not set'
+
+        channels = config.monitored_channels.get(guild_id, ())
+        if channels:
+            monitored_channels_list = "\n".join(" ".join(f"<#{channel_id}>" for channel_id in channels[i:i + 3])
+                                                for i in range(0, len(channels), 3))
+        else:
+            monitored_channels_list = "No monitored channels set."
+
+        return (
+            ("Unpin Time", f"`{unpin_time} minute(s)`"),
+            ("Thread Deletion Time", f"`{thread_deletion_time} minute(s)`"),
+            ("Thread Creation Enabled", f"`{force_thread_creation}`"),
+            ("Discord Invite Link", f"`{invite_link}`"),
+            ("Webhook Link", f"`{webhook_link}`"),
+            ("Monitored Channels", monitored_channels_list),
+        )
+
+    def get_fields(self, guild_id):
+        version = self.bot.config.guild_versions.get(guild_id, 0)
+        cached = self.fields.get(guild_id)
+        if cached is None or cached[0] != version:
+            cached = self.fields[guild_id] = (version, self.render_fields(guild_id))
+        return cached[1]
@@ -0,0 +1,43 @@
+import asyncio
+
+class EditCoalescer:
+    """Collapses bursts of edits to the same message into one delayed update.
+
+    The first edit of a message opens a window of `window` seconds. Later
+    edits inside the window only replace the message to propagate, and when
+    the window closes the callback runs once with the latest version.
+    Closing the coalescer closes every open window at once.
+    """
+
+    def __init__(self, callback, window=2):
+        self.callback = callback
+        self.window = window
+        self.pending = {}
+        self.tasks = set()
+        self.flush_now = asyncio.Event()
+
+    def submit(self, message):
+        first_edit = message.id not in self.pending
+        self.pending[message.id] = message
+        if first_edit:
+            # The loop only keeps a weak reference to a task, so it is held here until it finishes
+            task = asyncio.create_task(self.flush(message.id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def flush(self, message_id):
+        try:
+            await asyncio.wait_for(self.flush_now.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        message = self.pending.pop(message_id)
+        try:
+            await self.callback(message)
+        except Exception as e:
+            print(f"Error propagating edit of message {message_id}: {e}")
+
+    async def close(self):
+        # Edits still inside their window are propagated rather than dropped
+        self.flush_now.set()
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
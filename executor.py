@@ -0,0 +1,116 @@
+import asyncio
+
+class TaskExecutor:
+    """Runs due tasks concurrently under a global and a per-channel limit.
+
+    The per-channel limit keeps bursts for one channel inside Discord's
+    per-route rate limit buckets, while different channels proceed in parallel.
+    Unpins are coalesced per channel: repeated message IDs are unpinned once,
+    messages the pin index knows are no longer pinned are skipped, and the
+    remaining requests are paced per channel, since Discord's pin buckets are
+    per channel too.
+    """
+
+    def __init__(self, bot, max_concurrency=10, max_per_channel=2, unpin_rate=5):
+        self.bot = bot
+        self.max_concurrency = max_concurrency
+        self.max_per_channel = max_per_channel
+        self.unpin_rate = unpin_rate
+        self.semaphore = None
+        self.channel_semaphores = {}
+        self.channel_pacers = {}
+
+    def get_channel_semaphore(self, channel_id):
+        semaphore = self.channel_semaphores.get(channel_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_channel)
+            self.channel_semaphores[channel_id] = semaphore
+        return semaphore
+
+    def get_channel_pacer(self, channel_id):
+        pacer = self.channel_pacers.get(channel_id)
+        if pacer is None:
+            pacer = RatePacer(self.unpin_rate)
+            self.channel_pacers[channel_id] = pacer
+        return pacer
+
+    async def run_task(self, guild_id, task):
+        # Take the channel slot first so a busy channel never holds a global slot while waiting
+        async with self.get_channel_semaphore(task['channel_id']):
+            async with self.semaphore:
+                if task['type'] == 'unpin':
+                    return await self.bot.execute_unpin_task(guild_id, task)
+                elif task['type'] == 'thread_deletion':
+                    return await self.bot.execute_thread_deletion_task(guild_id, task)
+                return False
+
+    async def run_unpin_batch(self, channel_id, batch):
+        results = []
+        async with self.get_channel_semaphore(channel_id):
+            for message_tasks in batch.values():
+                guild_id, task = message_tasks[0]
+
+                # A message the pin index already knows is unpinned needs no request at all
+                if self.bot.pin_index.is_seeded(channel_id) and not self.bot.pin_index.is_pinned(channel_id, task['message_id']):
+                    results.extend((entry, True) for entry in message_tasks)
+                    continue
+
+                await self.get_channel_pacer(channel_id).wait()
+                async with self.semaphore:
+                    try:
+                        success = await self.bot.execute_unpin_task(guild_id, task)
+                    except Exception as e:
+                        print(f"Error executing task {task} in guild {guild_id}: {e}")
+                        success = False
+
+                # Duplicate tasks for the same message share the outcome of the one request
+                results.extend((entry, success) for entry in message_tasks)
+        return results
+
+    async def run_single_task(self, guild_id, task):
+        try:
+            return [((guild_id, task), await self.run_task(guild_id, task))]
+        except Exception as e:
+            print(f"Error executing task {task} in guild {guild_id}: {e}")
+            return [((guild_id, task), False)]
+
+    async def run(self, due_tasks):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Group unpins by channel and by message, everything else runs on its own
+        unpin_batches = {}
+        jobs = []
+        for guild_id, task in due_tasks:
+            if task['type'] == 'unpin':
+                channel_batch = unpin_batches.setdefault(task['channel_id'], {})
+                channel_batch.setdefault(task['message_id'], []).append((guild_id, task))
+            else:
+                jobs.append(self.run_single_task(guild_id, task))
+        jobs.extend(self.run_unpin_batch(channel_id, batch) for channel_id, batch in unpin_batches.items())
+
+        completed = []
+        failed = []
+        for results in await asyncio.gather(*jobs):
+            for entry, success in results:
+                if success:
+                    completed.append(entry)
+                else:
+                    failed.append(entry)
+
+        return completed, failed
+
+class RatePacer:
+    """Spaces out requests so that no more than `rate` start per second."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = 0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start_time = max(now, self.next_time)
+        self.next_time = start_time + self.interval
+        if start_time > now:
+            await asyncio.sleep(start_time - now)
@@ -1,3 +1,4 @@
+import os
 import json
 from datetime import datetime, timezone
 
@@ -61,71 +62,203 @@ def save_webhooks(webhooks, webhooks_file):
     except Exception as e:
         print(f"Failed to save webhooks: {e}")
 
-def load_tasks(tasks_file):
+def serialize_task(task):
+    serializable_task = task.copy()
+    if 'unpin_time' in serializable_task:
+        serializable_task['unpin_time'] = serializable_task['unpin_time'].isoformat()
+    if 'thread_deletion_time' in serializable_task:
+        serializable_task['thread_deletion_time'] = serializable_task['thread_deletion_time'].isoformat()
+    return serializable_task
+
+def deserialize_task(task):
+    # Convert string timestamps back to datetime objects
+    if 'unpin_time' in task:
+        task['unpin_time'] = datetime.fromisoformat(task['unpin_time'])
+    if 'thread_deletion_time' in task:
+        task['thread_deletion_time'] = datetime.fromisoformat(task['thread_deletion_time'])
+    return task
+
+def task_key(task):
+    if task['type'] == 'unpin':
+        return ('unpin', task['channel_id'], task['message_id'], get_task_due_time(task).isoformat())
+    return (task['type'], task['channel_id'], task['thread_id'], get_task_due_time(task).isoformat())
+
+def load_tasks_snapshot(tasks_file, missing_ok=True):
     try:
         with open(tasks_file, 'r') as file:
             tasks = json.load(file)
-            # Convert string timestamps back to datetime objects
+            generation = tasks.pop('_generation', 0)
             for guild_id, guild_tasks in tasks.items():
                 for task in guild_tasks:
-                    if 'unpin_time' in task:
-                        task['unpin_time'] = datetime.fromisoformat(task['unpin_time'])
-                    if 'thread_deletion_time' in task:
-                        task['thread_deletion_time'] = datetime.fromisoformat(task['thread_deletion_time'])
-            return tasks
+                    deserialize_task(task)
+            return tasks, generation
     except (FileNotFoundError, json.JSONDecodeError):
+        if not missing_ok:
+            raise
         print(f"No tasks file found at {tasks_file}, starting fresh.")
         save_tasks({}, tasks_file)
-        return {}
+        return {}, 0
 
-def save_tasks(tasks, tasks_file):
+def replay_task_journal(tasks, journal_file, generation, unmatched=None):
+    try:
+        with open(journal_file, 'r') as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        return 0
+
+    # A journal written before the last snapshot was taken is already part of it
+    if not lines or json.loads(lines[0]).get('generation') != generation:
+        return 0
+
+    records = []
+    for line in lines[1:]:
+        # A record without its newline was cut off by a crash, even if what is there parses
+        try:
+            if not line.endswith("\n"):
+                raise json.JSONDecodeError("Missing newline", line, len(line))
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            print(f"Skipping torn record at the end of {journal_file}.")
+            break
+    if not records:
+        return 0
+
+    # Only index the tasks the records refer to. Records written before tasks had IDs name them by key instead,
+    # and building full keys for every task is the slow part of a load
+    referenced_ids = {record['id'] for record in records if record['op'] != 'add' and 'id' in record}
+    referenced = {(record['guild'], record['key'][1], record['key'][2]) for record in records
+                  if record['op'] != 'add' and 'key' in record}
+    by_id = {}
+    index = {}
+    if referenced_ids or referenced:
+        for guild_id, guild_tasks in tasks.items():
+            for task in guild_tasks:
+                if task.get('id') in referenced_ids:
+                    by_id[task['id']] = task
+                target_id = task['message_id'] if task['type'] == 'unpin' else task['thread_id']
+                if (guild_id, task['channel_id'], target_id) in referenced:
+                    index.setdefault((guild_id, task_key(task)), []).append(task)
+
+    removed = set()
+    replayed = 0
+    for record in records:
+        guild_id = record['guild']
+        if record['op'] == 'add':
+            task = deserialize_task(record['task'])
+            tasks.setdefault(guild_id, []).append(task)
+            if 'id' in task:
+                by_id[task['id']] = task
+            if referenced:
+                index.setdefault((guild_id, task_key(task)), []).append(task)
+        elif 'id' in record:
+            task = by_id.get(record['id'])
+            if task is None:
+                # The task may not be loaded yet, keep the record for when it is
+                if unmatched is not None:
+                    unmatched.setdefault(record['id'], []).append(record)
+                continue
+            if record['op'] == 'del':
+                removed.add(id(by_id.pop(record['id'])))
+            elif record['op'] == 'set':
+                apply_task_update(task, record)
+        else:
+            matches = index.get((guild_id, tuple(record['key'])))
+            if not matches:
+                continue
+            if record['op'] == 'del':
+                removed.add(id(matches.pop(0)))
+            elif record['op'] == 'set':
+                matches[0]['retries'] = record['retries']
+        replayed += 1
+
+    if removed:
+        for guild_id in list(tasks):
+            tasks[guild_id] = [task for task in tasks[guild_id] if id(task) not in removed]
+            if not tasks[guild_id]:
+                del tasks[guild_id]
+
+    return replayed
+
+def apply_task_update(task, record):
+    task['retries'] = record['retries']
+    if 'due' in record:
+        set_task_due_time(task, datetime.fromisoformat(record['due']))
+
+def apply_journal_records(tasks, records):
+    """Apply journal records kept back by replay_task_journal to tasks loaded later."""
+    if not records:
+        return
+    for guild_id in list(tasks):
+        remaining_tasks = []
+        for task in tasks[guild_id]:
+            deleted = False
+            for record in records.pop(task['id'], ()):
+                if record['op'] == 'del':
+                    deleted = True
+                else:
+                    apply_task_update(task, record)
+            if not deleted:
+                remaining_tasks.append(task)
+        if remaining_tasks:
+            tasks[guild_id] = remaining_tasks
+        else:
+            del tasks[guild_id]
+
+def load_tasks(tasks_file, journal_file=None):
+    tasks, generation = load_tasks_snapshot(tasks_file)
+    if journal_file:
+        replay_task_journal(tasks, journal_file, generation)
+    return tasks
+
+def save_tasks(tasks, tasks_file, generation=0):
     try:
         # Convert datetime objects to ISO format strings for JSON serialization
         serializable_tasks = {}
         for guild_id, guild_tasks in tasks.items():
-            guild_id_str = str(guild_id)  # Ensure guild_id is a string
-            serializable_tasks[guild_id_str] = []
-            for task in guild_tasks:
-                serializable_task = task.copy()
-                if 'unpin_time' in serializable_task:
-                    serializable_task['unpin_time'] = serializable_task['unpin_time'].isoformat()
-                if 'thread_deletion_time' in serializable_task:
-                    serializable_task['thread_deletion_time'] = serializable_task['thread_deletion_time'].isoformat()
-                serializable_tasks[guild_id_str].append(serializable_task)
-
-        # Remove any empty guild entries
-        serializable_tasks = {k: v for k, v in serializable_tasks.items() if v}
-
-        with open(tasks_file, 'w') as f:
-            json.dump(serializable_tasks, f, indent=4)
+            if guild_tasks:  # Skip any empty guild entries
+                serializable_tasks[str(guild_id)] = [serialize_task(task) for task in guild_tasks]
+        serializable_tasks['_generation'] = generation
+
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        temp_file = f"{tasks_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(serializable_tasks, f, separators=(',', ':'))
+        os.replace(temp_file, tasks_file)
+        return True
     except Exception as e:
         print(f"Failed to save tasks: {e}")
+        return False
 
-async def add_unpin_task(tasks, guild_id, channel_id, message_id, unpin_time):
-    guild_id_str = str(guild_id)
-    if guild_id_str not in tasks:
-        tasks[guild_id_str] = []
-    
-    tasks[guild_id_str].append({
+async def add_unpin_task(task_store, guild_id, channel_id, message_id, unpin_time):
+    task = {
         'type': 'unpin',
         'channel_id': channel_id,
         'message_id': message_id,
         'unpin_time': unpin_time,
         'retries': 0
-    })
+    }
+    return task_store.add(guild_id, task)
 
-async def add_thread_deletion_task(tasks, guild_id, channel_id, thread_id, thread_deletion_time):
-    guild_id_str = str(guild_id)
-    if guild_id_str not in tasks:
-        tasks[guild_id_str] = []
-    
-    tasks[guild_id_str].append({
+async def add_thread_deletion_task(task_store, guild_id, channel_id, thread_id, thread_deletion_time):
+    task = {
         'type': 'thread_deletion',
         'channel_id': channel_id,
         'thread_id': thread_id,
         'thread_deletion_time': thread_deletion_time,
         'retries': 0
-    })
+    }
+    return task_store.add(guild_id, task)
+
+def get_task_due_time(task):
+    if 'unpin_time' in task:
+        return task['unpin_time']
+    return task['thread_deletion_time']
+
+def set_task_due_time(task, due_time):
+    if task['type'] == 'unpin':
+        task['unpin_time'] = due_time
+    else:
+        task['thread_deletion_time'] = due_time
 
 async def remove_completed_tasks(tasks, guild_id):
     now = datetime.now(timezone.utc)
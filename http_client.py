@@ -0,0 +1,68 @@
+import re
+import asyncio
+import aiohttp
+from ratelimit import OutboundScheduler, POST_PRIORITY, EDIT_PRIORITY
+
+discord_api_pattern = re.compile(r"https://discord\.com/api(?:/v\d+)?")
+
+class HttpClient:
+    """Shared aiohttp session for the raw webhook calls made outside discord.py.
+
+    Connections are pooled and kept alive between requests, and every request
+    runs under a total timeout so a slow endpoint can never hang a handler.
+    Requests are queued on an OutboundScheduler that keeps them inside
+    Discord's rate limits. When `base_url` is set, Discord API URLs such as
+    stored webhook URLs are sent there instead, e.g. to a local mock server.
+    """
+
+    def __init__(self, timeout=10, connection_limit=100, keepalive_timeout=60, base_url=None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.timeout = timeout
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.scheduler = OutboundScheduler(self.send)
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit, keepalive_timeout=self.keepalive_timeout),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self.session
+
+    def resolve_url(self, url):
+        if self.base_url is None:
+            return url
+        match = discord_api_pattern.match(url)
+        return self.base_url + url[match.end():] if match else url
+
+    async def send(self, method, url, json=None, params=None):
+        url = self.resolve_url(url)
+        async with self.get_session().request(method, url, json=json, params=params) as response:
+            data = None
+            if response.status != 204:
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    data = None
+            # 429s are left to the scheduler, which retries them once the bucket resets
+            if response.status != 429:
+                response.raise_for_status()
+            return response.status, response.headers, data
+
+    async def request(self, method, url, json=None, params=None, priority=EDIT_PRIORITY):
+        return await self.scheduler.submit(method, url, json=json, params=params, priority=priority)
+
+    async def post(self, url, json=None, params=None):
+        return await self.request('POST', url, json=json, params=params, priority=POST_PRIORITY)
+
+    async def patch(self, url, json=None, params=None):
+        return await self.request('PATCH', url, json=json, params=params, priority=EDIT_PRIORITY)
+
+    async def close(self):
+        await self.scheduler.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+HttpError = (aiohttp.ClientError, asyncio.TimeoutError)
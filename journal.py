@@ -0,0 +1,308 @@
+import os
+import json
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+from snapshot import TaskSnapshot, write_task_snapshot
+from functions import (
+    apply_journal_records,
+    load_tasks_snapshot,
+    get_task_due_time,
+    replay_task_journal,
+    serialize_task
+)
+
+class TaskJournal:
+    """Write-ahead journal for the task store.
+
+    Task additions, completions and retry updates are appended to the journal
+    as compact one-line records. Once the journal holds `compact_threshold`
+    records it is folded into a fresh binary snapshot (tasks.bin), so the
+    records replayed at startup stay bounded however many tasks there are.
+    On the event loop the snapshot is written from a worker thread, while new
+    records already go to the next journal; if it never reaches disk, the two
+    journals are joined back together.
+
+    With a load horizon only the tasks due within it are read at startup, the
+    rest stay in the memory-mapped snapshot until load_pending is called.
+    Records name tasks by their ID; tasks stored before they had IDs are all
+    read at once, numbered and compacted, so their IDs are on disk from then on.
+    A read-only load, as done to migrate or repartition the data, numbers them
+    in memory only and leaves every file as it found it.
+
+    Compaction keeps the snapshot and journal it replaces as tasks.bin.prev and
+    the .prev journal. If tasks.bin cannot be read, the tasks are rebuilt from
+    those instead, and with nothing to rebuild from loading fails rather than
+    starting with no tasks.
+    """
+
+    def __init__(self, tasks_file, journal_file=None, snapshot_file=None, compact_threshold=20000):
+        self.tasks_file = tasks_file
+        self.journal_file = journal_file or f"{tasks_file}.journal"
+        self.snapshot_file = snapshot_file or f"{os.path.splitext(tasks_file)[0]}.bin"
+        self.previous_snapshot_file = f"{self.snapshot_file}.prev"
+        self.previous_journal_file = f"{self.journal_file}.prev"
+        self.compact_threshold = compact_threshold
+        self.generation = 0
+        self.records = 0
+        self.file = None
+        self.snapshot = None
+        self.pending_start = 0
+        self.unmatched = {}
+        self.max_id = 0
+        self.compacting = None
+        self.compact_at = compact_threshold
+
+    def load_snapshot(self, horizon=None):
+        snapshot = TaskSnapshot(self.snapshot_file)
+        self.max_id = snapshot.max_id
+        if horizon is None or snapshot.version == 1:
+            stop = len(snapshot)
+        else:
+            stop = snapshot.index_after(datetime.now(timezone.utc) + timedelta(seconds=horizon))
+        tasks = snapshot.materialize(0, stop)
+
+        if stop < len(snapshot):
+            self.snapshot = snapshot
+            self.pending_start = stop
+        else:
+            snapshot.close()
+        return tasks, snapshot.generation
+
+    def load_previous_snapshot(self, error, read_only=False):
+        """Rebuild the tasks of an unreadable snapshot from the one before it and the journal written after that."""
+        print(f"Failed to read task snapshot {self.snapshot_file}: {error}. Recovering from the previous snapshot.")
+        if os.path.exists(self.previous_snapshot_file):
+            snapshot = TaskSnapshot(self.previous_snapshot_file)
+            tasks = snapshot.materialize(0, len(snapshot))
+            generation = snapshot.generation
+            snapshot.close()
+        elif os.path.exists(self.tasks_file):
+            tasks, generation = load_tasks_snapshot(self.tasks_file, missing_ok=False)
+        else:
+            raise RuntimeError(f"{self.snapshot_file} cannot be read and there is no earlier snapshot to recover "
+                               f"from. Restore it from a backup; {self.journal_file} has been left as it was.")
+
+        replayed = replay_task_journal(tasks, self.previous_journal_file, generation)
+        print(f"Recovered {sum(len(guild_tasks) for guild_tasks in tasks.values())} task(s) and "
+              f"{replayed} journal record(s) from generation {generation}.")
+        # Kept for inspection, and so the next compaction does not keep it as the previous snapshot
+        if not read_only:
+            os.replace(self.snapshot_file, f"{self.snapshot_file}.corrupt")
+        return tasks, generation + 1
+
+    def load(self, horizon=None, read_only=False):
+        # The binary snapshot replaces tasks.json, which is only read until the first compaction
+        self.max_id = 0
+        recovered = False
+        if os.path.exists(self.snapshot_file):
+            try:
+                tasks, self.generation = self.load_snapshot(horizon)
+            except (OSError, ValueError) as e:
+                tasks, self.generation = self.load_previous_snapshot(e, read_only)
+                recovered = True
+        else:
+            tasks, self.generation = load_tasks_snapshot(self.tasks_file)
+
+        self.unmatched = {}
+        self.compacting = None
+        unmatched = self.unmatched if self.snapshot is not None else None
+        # A compaction that never finished left the records made after it started in a journal one generation on
+        interrupted = (not recovered and self.journal_generation(self.journal_file) == self.generation + 1
+                       and self.journal_generation(self.previous_journal_file) == self.generation)
+        if interrupted:
+            self.records = (replay_task_journal(tasks, self.previous_journal_file, self.generation, unmatched)
+                            + replay_task_journal(tasks, self.journal_file, self.generation + 1, unmatched))
+        else:
+            self.records = replay_task_journal(tasks, self.journal_file, self.generation, unmatched)
+        if self.records:
+            print(f"Replayed {self.records} journal record(s) from {self.journal_file}.")
+
+        task_ids = [task.get('id') for guild_tasks in tasks.values() for task in guild_tasks]
+        numbered = None in task_ids
+        if numbered:
+            task_ids = self.number_tasks(tasks)
+        self.max_id = max(task_ids + [self.max_id])
+        if read_only:
+            return tasks
+
+        if interrupted:
+            self.rejoin_journals(self.generation)
+        if recovered or numbered:
+            self.compact(tasks)
+        self.open()
+        return tasks
+
+    def number_tasks(self, tasks):
+        print(f"Giving the tasks in {self.journal_file} IDs.")
+        task_ids = itertools.count(1)
+        for guild_tasks in tasks.values():
+            for task in guild_tasks:
+                task['id'] = next(task_ids)
+        return list(range(1, next(task_ids)))
+
+    def has_pending(self):
+        return self.snapshot is not None
+
+    def load_pending(self, chunk_size=20000):
+        """Materialize the next chunk of tasks left in the snapshot at startup."""
+        if self.snapshot is None:
+            return {}
+        stop = min(self.pending_start + chunk_size, len(self.snapshot))
+        tasks = self.snapshot.materialize(self.pending_start, stop)
+        apply_journal_records(tasks, self.unmatched)
+        self.pending_start = stop
+
+        if stop >= len(self.snapshot):
+            self.snapshot.close()
+            self.snapshot = None
+            self.unmatched = {}
+        return tasks
+
+    def open(self):
+        if self.file is not None:
+            self.file.close()
+
+        # Keep appending to a journal that belongs to the current snapshot, otherwise start a new one
+        if self.journal_generation(self.journal_file) == self.generation:
+            self.drop_torn_record()
+            self.file = open(self.journal_file, 'a')
+        else:
+            # The records of an older journal are in a snapshot by now, it goes with the previous one
+            if os.path.exists(self.journal_file):
+                os.replace(self.journal_file, self.previous_journal_file)
+            self.file = open(self.journal_file, 'w')
+            self.file.write(json.dumps({'generation': self.generation}) + "\n")
+            self.file.flush()
+            self.records = 0
+            self.compact_at = self.compact_threshold
+
+    def journal_generation(self, journal_file):
+        try:
+            with open(journal_file, 'r') as file:
+                return json.loads(file.readline() or '{}').get('generation')
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def rejoin_journals(self, generation):
+        """Fold the journal started for a snapshot that never reached disk back into the one before it."""
+        self.close()
+        lines = []
+        for journal_file in (self.previous_journal_file, self.journal_file):
+            with open(journal_file, 'r') as file:
+                lines.extend(line for line in file.readlines()[1:] if line.endswith("\n"))
+
+        temp_file = f"{self.journal_file}.tmp"
+        with open(temp_file, 'w') as file:
+            file.write(json.dumps({'generation': generation}) + "\n")
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.journal_file)
+        self.generation = generation
+        self.records = len(lines)
+
+    def drop_torn_record(self):
+        # A crash in the middle of an append leaves a partial last line, and records appended after it would
+        # be skipped along with it on the next replay. Appends only ever tear the end, after the last newline
+        with open(self.journal_file, 'rb+') as file:
+            size = file.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                file.seek(start)
+                newline = file.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                print(f"Dropping {size - end} byte(s) of a torn record from the end of {self.journal_file}.")
+                file.truncate(end)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def write(self, records):
+        if not records:
+            return
+        try:
+            if self.file is None:
+                self.open()
+            self.file.write("".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records))
+            self.file.flush()
+            self.records += len(records)
+        except Exception as e:
+            print(f"Failed to write task journal: {e}")
+
+    def append_add(self, guild_id, task):
+        self.write([{'op': 'add', 'guild': str(guild_id), 'task': serialize_task(task)}])
+
+    def append_remove(self, completed_tasks):
+        self.write([{'op': 'del', 'guild': str(guild_id), 'id': task['id']}
+                    for guild_id, task in completed_tasks])
+
+    def append_update(self, updated_tasks):
+        self.write([{'op': 'set', 'guild': str(guild_id), 'id': task['id'], 'retries': task['retries'],
+                     'due': get_task_due_time(task).isoformat()}
+                    for guild_id, task in updated_tasks])
+
+    def install_snapshot(self, new_file):
+        if os.path.exists(self.snapshot_file):
+            os.replace(self.snapshot_file, self.previous_snapshot_file)
+            # tasks.json is the fallback until a previous binary snapshot takes its place
+            if os.path.exists(self.tasks_file):
+                os.remove(self.tasks_file)
+        os.replace(new_file, self.snapshot_file)
+
+    def compact(self, tasks):
+        # Tasks still in the old snapshot are not in `tasks` yet, compacting now would drop them
+        if self.snapshot is not None or self.compacting is not None:
+            return False
+
+        # Only move to a new journal once the snapshot covering the old one is on disk
+        new_file = f"{self.snapshot_file}.new"
+        if not write_task_snapshot(tasks, new_file, self.generation + 1):
+            return False
+        self.install_snapshot(new_file)
+        self.generation += 1
+        self.open()
+        return True
+
+    def start_compaction(self, tasks):
+        # The guild lists are copied, not the tasks: records from here on go to the next journal, so a change
+        # the copy misses is replayed on top of the snapshot, and one it picks up is replayed to the same result
+        tasks = {guild_id: list(guild_tasks) for guild_id, guild_tasks in tasks.items()}
+        self.generation += 1
+        self.open()
+        self.compacting = asyncio.get_running_loop().create_task(self.write_snapshot(tasks, self.generation))
+
+    async def write_snapshot(self, tasks, generation):
+        new_file = f"{self.snapshot_file}.new"
+        written = False
+        try:
+            written = await asyncio.to_thread(write_task_snapshot, tasks, new_file, generation)
+        finally:
+            self.compacting = None
+            if written and self.generation == generation:
+                self.install_snapshot(new_file)
+            elif self.generation == generation:
+                self.rejoin_journals(generation - 1)
+                self.open()
+                self.compact_at = self.records + self.compact_threshold
+
+    def maybe_compact(self, tasks):
+        # After a failed compaction the next try waits for another threshold's worth of records
+        if self.records < self.compact_at or self.snapshot is not None or self.compacting is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if not self.compact(tasks):
+                self.compact_at = self.records + self.compact_threshold
+            return
+        self.start_compaction(tasks)
@@ -3,77 +3,146 @@ import asyncio
 import discord
 from dotenv import load_dotenv
 from discord.ext import commands
-from datetime import datetime, timezone
 from commands import setup_commands
-from logic import handle_message, handle_message_edit
+from logic import handle_message, handle_message_edit, propagate_message_edit
+from scheduler import TaskScheduler
+from executor import TaskExecutor
+from task_index import TaskIndex
+from task_store import TaskStore
+from storage import create_storage
+from config import ConfigService, ConfigWatcher, SettingsRenderer
+from http_client import HttpClient
+from cache import TTLCache
+from pins import PinIndex, PinNoticeCleaner
+from routing import RoutingTable
+from sent_messages import SentMessageIndex
+from edits import EditCoalescer
+from metrics import BotMetrics
 from functions import (
-    load_monitored_channels,
-    save_monitored_channels,
-    load_settings,
-    save_settings,
-    load_webhooks,
-    save_webhooks,
-    load_tasks,
-    save_tasks,
     add_unpin_task,
     add_thread_deletion_task,
-    remove_completed_tasks,
-    get_due_tasks
+    set_task_due_time
 )
 
 load_dotenv()
 token = os.getenv("token")
+storage_backend = os.getenv("storage", "json")
+metrics_port = os.getenv("metrics_port")
+data_dir = os.getenv("data_dir", ".")  # Set per worker by cluster.py
+shard_count = os.getenv("shard_count")
+shard_ids = [int(shard_id) for shard_id in os.getenv("shard_ids").split(",")] if os.getenv("shard_ids") else None
+api_base_url = os.getenv("api_base_url")  # e.g. http://127.0.0.1:8080/api/v10 for benchmarks/mock_discord.py
+if api_base_url:
+    discord.http.Route.BASE = api_base_url.rstrip('/')
 guild_id = None  # For syncing to a specific guild during testing
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 
-class pinBot(commands.Bot):
+# With a shard count the bot runs its shards over one AutoShardedBot, otherwise as a single connection
+BotBase = commands.AutoShardedBot if shard_count else commands.Bot
+
+class pinBot(BotBase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.max_pins = 50
+        self.max_concurrent_tasks = 10
+        self.max_concurrent_tasks_per_channel = 2
+        self.task_load_horizon = 3600  # Seconds ahead of startup whose tasks are loaded before connecting
+        self.catch_up_rate = 3  # Overdue tasks run per second after downtime, leaving room for live pins
+        self.active_messages = 0
         self.monitored_channels = {}
         self.settings = {}
         self.webhooks = {} 
-        self.data_file = "monitored_channels.json"
-        self.settings_file = "settings.json"
-        self.webhooks_file = "webhooks.json"
-        self.tasks_file = "tasks.json"
-        self.sent_webhook_messages = {}
-        self.tasks = {}
+        self.metrics = BotMetrics(self)
+        self.storage = create_storage(storage_backend, data_dir)
+        self.config_watcher = ConfigWatcher(self)
+        self.config = None
+        self.config_service = ConfigService(self)
+        self.routing = RoutingTable(self)
+        self.settings_renderer = SettingsRenderer(self)
+        self.sent_messages = SentMessageIndex(os.path.join(data_dir, "sent_messages.db"))
+        self.edit_coalescer = EditCoalescer(lambda message: propagate_message_edit(self, message))
+        self.http_client = HttpClient(base_url=api_base_url)
+        self.webhook_channels = TTLCache(ttl=6 * 3600)
+        self.pin_index = PinIndex(self)
+        self.pin_notices = PinNoticeCleaner(self)
+        self.task_store = TaskStore()
+        self.tasks = self.task_store.tasks
+        self.task_index = TaskIndex()
+        self.scheduler = TaskScheduler(self, catch_up_rate=self.catch_up_rate)
+        self.executor = TaskExecutor(self, self.max_concurrent_tasks, self.max_concurrent_tasks_per_channel)
         self.load_monitored_channels()
         self.load_settings()
         self.load_webhooks()
+        self.config_watcher.track_all()
         self.load_tasks()
 
     def load_monitored_channels(self):
-        self.monitored_channels = load_monitored_channels(self.data_file)
+        with self.metrics.storage_seconds.time(operation='load_monitored_channels'):
+            self.monitored_channels = self.storage.load_monitored_channels()
 
     def save_monitored_channels(self):
-        save_monitored_channels(self.monitored_channels, self.data_file)
+        with self.metrics.storage_seconds.time(operation='save_monitored_channels'):
+            self.storage.save_monitored_channels(self.monitored_channels)
+        self.config_watcher.note_saved('monitored_channels')
 
     def load_settings(self):
-        self.settings = load_settings(self.settings_file)
+        with self.metrics.storage_seconds.time(operation='load_settings'):
+            self.settings = self.storage.load_settings()
 
     def save_settings(self):
-        save_settings(self.settings, self.settings_file)
+        with self.metrics.storage_seconds.time(operation='save_settings'):
+            self.storage.save_settings(self.settings)
+        self.config_watcher.note_saved('settings')
 
     def load_webhooks(self):
-        loaded_webhooks = load_webhooks(self.webhooks_file)
+        with self.metrics.storage_seconds.time(operation='load_webhooks'):
+            loaded_webhooks = self.storage.load_webhooks()
         if isinstance(loaded_webhooks, dict):
             self.webhooks.update(loaded_webhooks)
 
     def save_webhooks(self, webhooks):
-        save_webhooks(webhooks, self.webhooks_file)
+        with self.metrics.storage_seconds.time(operation='save_webhooks'):
+            self.storage.save_webhooks(webhooks)
         self.webhooks = webhooks
+        self.config_watcher.note_saved('webhooks')
 
     def load_tasks(self):
-        self.tasks = load_tasks(self.tasks_file)
+        with self.metrics.storage_seconds.time(operation='load_tasks'):
+            loaded_tasks = self.storage.load_tasks(self.task_load_horizon)
+        self.task_store.reset(loaded_tasks, self.storage.max_task_id() + 1)
+        self.scheduler.clear()
+        self.scheduler.schedule_many(self.tasks)
+        self.task_index.clear()
+        self.task_index.add_many(self.tasks)
         #print(f'Loaded Tasks: {self.tasks}')
 
+    async def load_pending_tasks(self):
+        # Tasks due after the load horizon are brought in a chunk at a time once the bot is running
+        while self.storage.has_pending_tasks():
+            with self.metrics.storage_seconds.time(operation='load_pending_tasks'):
+                tasks = self.storage.load_pending_tasks()
+            # A task loaded at startup and since moved past the horizon is read again, the copy in memory is newer
+            tasks = {guild_id: [task for task in guild_tasks if self.task_store.get(task['id']) is None]
+                     for guild_id, guild_tasks in tasks.items()}
+            self.task_store.add_many(tasks)
+            self.scheduler.schedule_many(tasks)
+            self.task_index.add_many(tasks)
+            await asyncio.sleep(0)
+
     def save_tasks(self):
-        save_tasks(self.tasks, self.tasks_file)
+        with self.metrics.storage_seconds.time(operation='save_tasks'):
+            self.storage.save_tasks(self.tasks)
+
+    def record_tasks(self, added=(), removed=(), updated=()):
+        for guild_id, task in added:
+            self.task_index.add(guild_id, task)
+        for guild_id, task in removed:
+            self.task_index.remove(guild_id, task)
+        with self.metrics.storage_seconds.time(operation='record_tasks'):
+            self.storage.record_tasks(self.tasks, added, removed, updated)
 
     async def on_ready(self):
         #print(f'Logged in as {self.user} (ID: {self.user.id})')
@@ -93,48 +162,80 @@ class pinBot(commands.Bot):
 #            print(f"Guild with ID {guild_id_to_leave} not found.")
 
         await self.change_presence(activity=activity)
-        await self.reschedule_tasks()  # Run task rescheduling after bot is ready
+        # Overdue tasks are caught up on by the scheduler once per process, not on every reconnect
 
     async def setup_hook(self):
+        self.metrics.instrument_http(self.http)
+        if metrics_port:
+            await self.metrics.start(int(metrics_port))
         await setup_commands(self)
-        if guild_id:
-            guild = discord.Object(id=guild_id)
-            await self.tree.sync(guild=guild)
-        else:
-            await self.tree.sync()
+        # Commands are global, so in a cluster only the worker running shard 0 syncs them
+        if not shard_ids or 0 in shard_ids:
+            if guild_id:
+                guild = discord.Object(id=guild_id)
+                await self.tree.sync(guild=guild)
+            else:
+                await self.tree.sync()
+        self.loop.create_task(self.load_pending_tasks())
+        self.loop.create_task(self.scheduler.run())
         self.loop.create_task(self.periodic_task_check())
 
     async def periodic_task_check(self):
         while True:
             await asyncio.sleep(60)
 
-            due_tasks = await get_due_tasks(self.tasks)
-            if due_tasks:
-                await self.reschedule_tasks()
+            try:
+                self.config_watcher.check()
+            except Exception as e:
+                print(f"Error checking for config changes: {e}")
 
-            self.monitored_channels = load_monitored_channels(self.data_file)
-            self.settings = load_settings(self.settings_file)
-            self.webhooks = load_webhooks(self.webhooks_file)
+    async def close(self):
+        await self.config_service.close()
+        await self.edit_coalescer.close()
+        await self.pin_notices.close()
+        await self.http_client.close()
+        self.sent_messages.close()
+        await self.metrics.close()
+        await super().close()
 
     async def on_message(self, message):
-        await handle_message(self, message)
+        if self.pin_notices.on_message(message):
+            return
+        self.active_messages += 1
+        try:
+            with self.metrics.handle_message_seconds.time():
+                await handle_message(self, message)
+        finally:
+            self.active_messages -= 1
 
     async def on_message_edit(self, before, after):
-        await handle_message_edit(self, before, after)
+        with self.metrics.handle_message_edit_seconds.time():
+            await handle_message_edit(self, before, after)
+
+    async def on_guild_channel_pins_update(self, channel, last_pin):
+        self.pin_index.on_pins_update(channel.id)
 
     async def execute_unpin_task(self, guild_id, task):
         channel = self.get_channel(task['channel_id'])
         if channel:
+            expects_update = self.pin_index.is_pinned(channel.id, task['message_id'])
+            if expects_update:
+                self.pin_index.expect_update(channel.id)
             try:
-                message = await channel.fetch_message(task['message_id'])
-                await message.unpin()
+                await channel.get_partial_message(task['message_id']).unpin()
+                self.pin_index.remove(channel.id, task['message_id'])
                 return True
             except discord.NotFound:
+                if expects_update:
+                    self.pin_index.cancel_update(channel.id)
+                self.pin_index.remove(channel.id, task['message_id'])
                 print(f"Message {task['message_id']} not found in guild {guild_id}, considering it as unpinned.")
                 return True
             except discord.Forbidden:
+                self.pin_index.invalidate(channel.id)
                 print(f"No permission to unpin message {task['message_id']} in guild {guild_id}.")
             except Exception as e:
+                self.pin_index.invalidate(channel.id)
                 print(f"Error unpinning message {task['message_id']} in guild {guild_id}: {e}")
         else:
             print(f"Channel {task['channel_id']} not found in guild {guild_id}.")
@@ -176,40 +277,105 @@ class pinBot(commands.Bot):
             print("Bot is not ready yet, delaying task rescheduling")
             return
         
-        due_tasks = await get_due_tasks(self.tasks)
-        tasks_to_remove = []
-
-        for guild_id, task in due_tasks:
-            success = False
-            if task['type'] == 'unpin':
-                success = await self.execute_unpin_task(guild_id, task)
-            elif task['type'] == 'thread_deletion':
-                success = await self.execute_thread_deletion_task(guild_id, task)
-
-            if success:
-                tasks_to_remove.append((guild_id, task))
-
-        for guild_id, task in tasks_to_remove:
-            self.tasks[guild_id].remove(task)
-
-        self.save_tasks()
+        due_tasks = self.scheduler.pop_due()
+        if due_tasks:
+            await self.run_due_tasks(due_tasks)
+
+    async def run_due_tasks(self, due_tasks):
+        completed_tasks, failed_tasks = await self.executor.run(due_tasks)
+
+        # Tasks cancelled while they were running are already gone from the store
+        failed_tasks = [(guild_id, task) for guild_id, task in failed_tasks if self.task_store.get(task['id'])]
+        for guild_id, task in failed_tasks:
+            self.scheduler.retry(guild_id, task)
+
+        removed_tasks = [removed for removed in (self.task_store.remove(task['id']) for _, task in completed_tasks)
+                         if removed is not None]
+        self.record_tasks(removed=removed_tasks, updated=failed_tasks)
+
+    def tasks_loading(self):
+        return self.storage.has_pending_tasks()
+
+    def check_tasks_loaded(self):
+        # Tasks past the load horizon are not indexed yet, so a lookup could miss them and report them as gone
+        if self.tasks_loading():
+            raise RuntimeError("Tasks are still being loaded, try again once loading has finished.")
+
+    def get_task(self, task_id):
+        """Return (guild ID, task) for a task ID, or None."""
+        self.check_tasks_loaded()
+        return self.task_store.get(task_id)
+
+    def get_message_tasks(self, message_id):
+        self.check_tasks_loaded()
+        return [self.task_store.get(task_id) for task_id in self.task_store.message_task_ids(message_id)]
+
+    def get_thread_tasks(self, thread_id):
+        self.check_tasks_loaded()
+        return [self.task_store.get(task_id) for task_id in self.task_store.thread_task_ids(thread_id)]
+
+    def cancel_tasks(self, task_ids):
+        self.check_tasks_loaded()
+        removed_tasks = []
+        for task_id in task_ids:
+            removed = self.task_store.remove(task_id)
+            if removed is not None:
+                self.scheduler.discard(removed[1])
+                removed_tasks.append(removed)
+        if removed_tasks:
+            self.record_tasks(removed=removed_tasks)
+        return removed_tasks
+
+    def cancel_task(self, task_id):
+        return self.cancel_tasks([task_id])
+
+    def cancel_message_tasks(self, message_id):
+        return self.cancel_tasks(self.task_store.message_task_ids(message_id))
+
+    def cancel_thread_tasks(self, thread_id):
+        return self.cancel_tasks(self.task_store.thread_task_ids(thread_id))
+
+    def update_task_due_times(self, task_ids, due_time):
+        self.check_tasks_loaded()
+        updated_tasks = []
+        for task_id in task_ids:
+            found = self.task_store.get(task_id)
+            if found is None:
+                continue
+            guild_id, task = found
+            # The index is keyed on the old due time, so the task leaves it before the time changes
+            self.task_index.remove(guild_id, task)
+            set_task_due_time(task, due_time)
+            self.task_index.add(guild_id, task)
+            self.scheduler.schedule(guild_id, task)
+            updated_tasks.append(found)
+        if updated_tasks:
+            self.record_tasks(updated=updated_tasks)
+        return updated_tasks
+
+    def reschedule_task(self, task_id, due_time):
+        return self.update_task_due_times([task_id], due_time)
+
+    def reschedule_message_tasks(self, message_id, due_time):
+        return self.update_task_due_times(self.task_store.message_task_ids(message_id), due_time)
 
     async def schedule_unpin(self, message, unpin_time):
-        await add_unpin_task(self.tasks, message.guild.id, message.channel.id, message.id, unpin_time)
-        self.save_tasks()
+        task = await add_unpin_task(self.task_store, message.guild.id, message.channel.id, message.id, unpin_time)
+        self.scheduler.schedule(str(message.guild.id), task)
+        self.record_tasks(added=[(message.guild.id, task)])
 
     async def schedule_thread_deletion(self, message, thread_id, thread_deletion_time):
-        await add_thread_deletion_task(self.tasks, message.guild.id, message.channel.id, thread_id, thread_deletion_time)
-        self.save_tasks()
+        task = await add_thread_deletion_task(self.task_store, message.guild.id, message.channel.id, thread_id, thread_deletion_time)
+        self.scheduler.schedule(str(message.guild.id), task)
+        self.record_tasks(added=[(message.guild.id, task)])
 
     def store_sent_webhook_message(self, original_message_id, webhook_message_id, webhook_url):
-        if original_message_id not in self.sent_webhook_messages:
-            self.sent_webhook_messages[original_message_id] = set()
-        
-        message_tuple = (webhook_message_id, webhook_url)
-        if message_tuple not in self.sent_webhook_messages[original_message_id]:
-            self.sent_webhook_messages[original_message_id].add(message_tuple)
+        self.sent_messages.add(original_message_id, webhook_message_id, webhook_url)
 
 
-client = pinBot(command_prefix=None, intents=intents)
-client.run(token)
\ No newline at end of file
+if __name__ == "__main__":
+    if shard_count:
+        client = pinBot(command_prefix=None, intents=intents, shard_count=int(shard_count), shard_ids=shard_ids)
+    else:
+        client = pinBot(command_prefix=None, intents=intents)
+    client.run(token)
\ No newline at end of file
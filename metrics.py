@@ -0,0 +1,228 @@
+import re
+import time
+import logging
+from bisect import bisect_left
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+webhook_token_pattern = re.compile(r"/webhooks/\d+/[^/?\s]+")
+
+def redact_route(route):
+    # Webhook URLs carry their token, which must never end up in a scrape
+    return webhook_token_pattern.sub('/webhooks/{webhook_id}/{token}', route)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{escape_label(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=(), function=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # A function is called at scrape time and returns either a value or a dict of label values -> value
+        self.function = function
+        self.values = {}
+
+    def label_values(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def samples(self):
+        if self.function is None:
+            return self.values.items()
+        values = self.function()
+        if isinstance(values, dict):
+            return [(key if isinstance(key, tuple) else (key,), value) for key, value in values.items()]
+        return [((), values)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self.samples():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, value=1, **labels):
+        key = self.label_values(labels)
+        self.values[key] = self.values.get(key, 0) + value
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        self.values[self.label_values(labels)] = value
+
+class Timer:
+    """Context manager that observes the time spent inside it on a histogram."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.start_time, **self.labels)
+        return False
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        series = self.values.get(key)
+        if series is None:
+            # Per-bucket counts, then the sum and count of all observations
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, **labels):
+        return Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels, label_values, [('le', format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts the 429s discord.py handles internally, which it only reports through its logger."""
+
+    def __init__(self, counter):
+        super().__init__(logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record):
+        if record.msg.startswith('We are being rate limited.'):
+            self.counter.inc(client='discord.py', route=f"{record.args[0]} {redact_route(str(record.args[1]))}")
+        elif record.msg.startswith('Global rate limit has been hit.'):
+            self.counter.inc(client='discord.py', route='global')
+
+class BotMetrics:
+    """Process metrics for the bot, served in the Prometheus text format.
+
+    Hot paths record into counters and histograms as they run. Values that
+    already live elsewhere (scheduler backlog, storage file sizes, webhook
+    429s, sent message index hits) are read by callback when the endpoint is scraped, so they cost
+    nothing in between.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.runner = None
+        self.handle_message_seconds = Histogram(
+            'pinbot_handle_message_seconds', 'Time spent in handle_message.')
+        self.handle_message_edit_seconds = Histogram(
+            'pinbot_handle_message_edit_seconds', 'Time spent in handle_message_edit.')
+        self.stage_seconds = Histogram(
+            'pinbot_stage_seconds', 'Time spent in each stage of forwarding and pinning a message.', ['stage'])
+        self.storage_seconds = Histogram(
+            'pinbot_storage_seconds', 'Time spent loading and saving stored data.', ['operation'])
+        self.scheduler_lag_seconds = Histogram(
+            'pinbot_scheduler_lag_seconds', 'Time between a task falling due and it being run.')
+        self.rest_requests = Counter(
+            'pinbot_rest_requests_total', 'REST requests made, by client and route.', ['client', 'route'])
+        self.rate_limited = Counter(
+            'pinbot_rate_limited_total', '429 responses received, by client and route.', ['client', 'route'])
+        self.metrics = [
+            self.handle_message_seconds,
+            self.handle_message_edit_seconds,
+            self.stage_seconds,
+            self.storage_seconds,
+            self.scheduler_lag_seconds,
+            self.rest_requests,
+            self.rate_limited,
+            Counter('pinbot_webhook_requests_total', 'Webhook requests sent through the outbound scheduler, by route.',
+                    ['route'], lambda: self.redact(bot.http_client.scheduler.requests)),
+            Counter('pinbot_webhook_rate_limited_total', 'Webhook 429 responses, by route.',
+                    ['route'], lambda: self.redact(bot.http_client.scheduler.rate_limited)),
+            Gauge('pinbot_scheduler_max_lag_seconds', 'Largest scheduler lag seen since startup.',
+                  function=lambda: bot.scheduler.max_lag.total_seconds()),
+            Gauge('pinbot_scheduler_catch_up_remaining', 'Overdue tasks left to run after downtime.',
+                  function=lambda: bot.scheduler.catch_up_remaining),
+            Gauge('pinbot_scheduler_backlog', 'Pending tasks, by guild.',
+                  ['guild_id'], lambda: bot.scheduler.backlog()),
+            Gauge('pinbot_storage_file_bytes', 'Size of the storage files, by file.',
+                  ['file'], lambda: bot.storage.file_sizes()),
+            Gauge('pinbot_sent_messages_cached', 'Webhook copies held in the in-memory index.',
+                  function=lambda: len(bot.sent_messages)),
+            Counter('pinbot_sent_messages_hits_total', 'Edits whose webhook copies were found in the sent message index.',
+                    function=lambda: bot.sent_messages.hits),
+            Counter('pinbot_sent_messages_misses_total', 'Edits of messages with no webhook copies in the sent message index.',
+                    function=lambda: bot.sent_messages.misses),
+            Counter('pinbot_sent_messages_evictions_total', 'Entries evicted from the in-memory sent message index.',
+                    function=lambda: bot.sent_messages.evictions),
+        ]
+
+    def redact(self, values):
+        redacted = {}
+        for route, value in values.items():
+            route = redact_route(route)
+            redacted[route] = redacted.get(route, 0) + value
+        return redacted
+
+    def instrument_http(self, http):
+        """Count the REST calls discord.py makes, by method and route template."""
+        request = http.request
+
+        async def counted_request(route, **kwargs):
+            self.rest_requests.inc(client='discord.py', route=f"{route.method} {route.path}")
+            return await request(route, **kwargs)
+
+        http.request = counted_request
+        logging.getLogger('discord.http').addHandler(RateLimitLogHandler(self.rate_limited))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+    async def handle_scrape(self, request):
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self, port, host='127.0.0.1'):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_scrape)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,67 @@
+import re
+from datetime import datetime, timezone
+
+ELENORA_BOT_ID = 735842992002433084
+FRIENDLY_BOT_ID = 457573832350236672
+BOSS_BOT_IDS = (1286639371038232698, 1284787241943699486)
+
+parsers = {}
+
+def register_parser(author_id, parser):
+    """Register the function that pulls the gametime out of an embed description for a source bot.
+
+    The parser takes the description string and returns a UTC datetime, or None when it holds no gametime.
+    """
+    parsers[author_id] = parser
+
+def parse_gametime(author_id, description):
+    parser = parsers.get(author_id)
+    if parser is None or not description:
+        return None
+    return parser(description)
+
+# "HH:MM mm/dd/YYYY" on the last line before "(gametime)"
+elenora_pattern = re.compile(r"(?:\A|\n)[^\S\n]*(\d{1,2}):(\d{1,2}) (\d{1,2})/(\d{1,2})/(\d{4})\s*\Z")
+
+def parse_elenora_gametime(description):
+    gametime_index = description.find("(gametime)")
+    if gametime_index == -1:
+        return None
+
+    match = elenora_pattern.search(description, 0, gametime_index)
+    if match is None:
+        print("Error parsing datetime: no gametime found before (gametime). Using default unpin time.")
+        return None
+
+    hour, minute, month, day, year = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), tzinfo=timezone.utc)
+    except ValueError as e:
+        print(f"Error parsing datetime: {e}. Using default unpin time.")
+        return None
+
+# "YYYY-mm-dd HH:MM" between the first pair of backticks
+backtick_pattern = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2})")
+
+def parse_backtick_gametime(description):
+    start = description.find("`") + 1
+    end = description.find("`", start)
+    if not start or end == -1:
+        return None
+
+    match = backtick_pattern.fullmatch(description, start, end)
+    if match is None:
+        print("Date format is incorrect, using default unpin time")
+        return None
+
+    year, month, day, hour, minute = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), tzinfo=timezone.utc)
+    except ValueError:
+        print("Date format is incorrect, using default unpin time")
+        return None
+
+register_parser(ELENORA_BOT_ID, parse_elenora_gametime)
+register_parser(FRIENDLY_BOT_ID, parse_backtick_gametime)
+for boss_bot_id in BOSS_BOT_IDS:
+    register_parser(boss_bot_id, parse_backtick_gametime)
@@ -0,0 +1,178 @@
+import time
+import asyncio
+import discord
+
+class PinIndex:
+    """In-memory list of pinned message IDs per channel, newest first.
+
+    A channel is seeded with one pins() call the first time it is needed and
+    then kept current from the bot's own pin and unpin calls. Pin updates
+    from the gateway that the bot did not cause mark the channel stale so
+    it is fetched again next time.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pins = {}
+        self.expected_updates = {}
+        self.locks = {}
+
+    def get_lock(self, channel_id):
+        lock = self.locks.get(channel_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.locks[channel_id] = lock
+        return lock
+
+    def is_seeded(self, channel_id):
+        return channel_id in self.pins
+
+    def is_pinned(self, channel_id, message_id):
+        return message_id in self.pins.get(channel_id, ())
+
+    async def get_pins(self, channel):
+        if channel.id not in self.pins:
+            pins = await channel.pins()
+            self.pins[channel.id] = [message.id for message in pins]
+            self.expected_updates[channel.id] = 0
+        return self.pins[channel.id]
+
+    def expect_update(self, channel_id):
+        # Called before a pin or unpin request, the gateway echo can arrive before the response does
+        if channel_id in self.expected_updates:
+            self.expected_updates[channel_id] += 1
+
+    def cancel_update(self, channel_id):
+        if self.expected_updates.get(channel_id, 0) > 0:
+            self.expected_updates[channel_id] -= 1
+
+    def add(self, channel_id, message_id):
+        pins = self.pins.get(channel_id)
+        if pins is not None and message_id not in pins:
+            pins.insert(0, message_id)
+
+    def remove(self, channel_id, message_id):
+        pins = self.pins.get(channel_id)
+        if pins is not None and message_id in pins:
+            pins.remove(message_id)
+
+    def invalidate(self, channel_id):
+        self.pins.pop(channel_id, None)
+        self.expected_updates.pop(channel_id, None)
+
+    def on_pins_update(self, channel_id):
+        if channel_id not in self.pins:
+            return
+        # Our own pin changes are echoed back by the gateway, anything else means the cache is stale
+        if self.expected_updates[channel_id] > 0:
+            self.expected_updates[channel_id] -= 1
+        else:
+            self.invalidate(channel_id)
+
+    async def pin_message(self, message):
+        channel = message.channel
+        async with self.get_lock(channel.id):
+            pins = await self.get_pins(channel)
+            if message.id in pins:
+                return
+
+            if len(pins) >= self.bot.max_pins:
+                oldest_pin = pins[-1]
+                self.expect_update(channel.id)
+                try:
+                    await channel.get_partial_message(oldest_pin).unpin()
+                    self.remove(channel.id, oldest_pin)
+                except discord.NotFound:
+                    self.cancel_update(channel.id)
+                    self.remove(channel.id, oldest_pin)
+                except discord.DiscordException as e:
+                    print(f"Failed to unpin the oldest pin in channel {channel.id}: {e}")
+                    self.invalidate(channel.id)
+
+            self.expect_update(channel.id)
+            self.bot.pin_notices.expect(channel.id, message.id)
+            try:
+                await message.pin()
+                self.add(channel.id, message.id)
+            except discord.DiscordException as e:
+                print(f"An error occurred while pinning: {e}")
+                self.bot.pin_notices.cancel(channel.id, message.id)
+                self.invalidate(channel.id)
+
+class PinNoticeCleaner:
+    """Deletes the "pinned a message" system notices caused by the bot's own pins.
+
+    Pins the bot is about to make are remembered for a short while. When the
+    matching notice arrives through on_message it is queued for its channel,
+    and each channel's queue is deleted shortly after, in bulk when several
+    notices have piled up. Closing the cleaner deletes the queued notices
+    straight away.
+    """
+
+    def __init__(self, bot, expiry=60, flush_delay=1):
+        self.bot = bot
+        self.expiry = expiry
+        self.flush_delay = flush_delay
+        self.expected = {}
+        self.pending = {}
+        self.tasks = set()
+        self.flush_now = asyncio.Event()
+
+    def expect(self, channel_id, message_id):
+        self.expected.setdefault(channel_id, {})[message_id] = time.monotonic() + self.expiry
+
+    def cancel(self, channel_id, message_id):
+        channel_expected = self.expected.get(channel_id)
+        if channel_expected is not None:
+            channel_expected.pop(message_id, None)
+            if not channel_expected:
+                del self.expected[channel_id]
+
+    def on_message(self, message):
+        if message.type != discord.MessageType.pins_add or message.reference is None:
+            return False
+
+        channel_expected = self.expected.get(message.channel.id)
+        if not channel_expected:
+            return False
+
+        now = time.monotonic()
+        for message_id in [message_id for message_id, expires_at in channel_expected.items() if expires_at <= now]:
+            del channel_expected[message_id]
+
+        if channel_expected.pop(message.reference.message_id, None) is None:
+            return False
+        if not channel_expected:
+            del self.expected[message.channel.id]
+
+        if message.channel.id not in self.pending:
+            self.pending[message.channel.id] = []
+            task = asyncio.create_task(self.flush(message.channel))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        self.pending[message.channel.id].append(message.id)
+        return True
+
+    async def flush(self, channel):
+        try:
+            await asyncio.wait_for(self.flush_now.wait(), self.flush_delay)
+        except asyncio.TimeoutError:
+            pass
+        message_ids = self.pending.pop(channel.id, [])
+        try:
+            with self.bot.metrics.stage_seconds.time(stage='purge'):
+                if len(message_ids) == 1:
+                    await channel.get_partial_message(message_ids[0]).delete()
+                elif message_ids:
+                    # Bulk delete takes at most 100 messages per request
+                    for i in range(0, len(message_ids), 100):
+                        await channel.delete_messages([discord.Object(id=message_id) for message_id in message_ids[i:i + 100]])
+        except discord.NotFound:
+            pass
+        except Exception as e:
+            print(f"Failed to delete pin notices in channel {channel.id}: {e}")
+
+    async def close(self):
+        self.flush_now.set()
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
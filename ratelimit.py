@@ -0,0 +1,204 @@
+import re
+import asyncio
+import itertools
+import aiohttp
+
+POST_PRIORITY = 0
+EDIT_PRIORITY = 1
+
+message_id_pattern = re.compile(r"/messages/\d+")
+major_parameter_pattern = re.compile(r"/(?:webhooks/\d+/[^/?]+|channels/\d+|guilds/\d+)")
+
+def get_route_key(method, url):
+    # Requests to different messages of one webhook share a route
+    return f"{method} {message_id_pattern.sub('/messages/{id}', url.split('?', 1)[0])}"
+
+def can_retry(method, error):
+    # A POST that may have reached Discord is not sent again, it would create the message twice
+    return method != 'POST' or isinstance(error, aiohttp.ClientConnectorError)
+
+def get_major_parameter(url):
+    # Discord applies a bucket separately to each webhook, channel or guild
+    match = major_parameter_pattern.search(url)
+    return match.group() if match else ''
+
+class Bucket:
+    def __init__(self):
+        self.limit = 1
+        self.window = 0
+        self.remaining = 1
+        self.reset_at = 0
+        self.waiting = []
+        self.release = None
+
+class OutboundScheduler:
+    """Queues raw webhook requests and sends them inside Discord's rate limits.
+
+    Requests are taken from a priority queue, so new posts go out before edit
+    PATCHes. Each route is mapped to the bucket Discord reports in its
+    X-RateLimit headers, kept per webhook or channel like Discord does. A
+    request whose bucket is out of room is set aside on the bucket and put
+    back on the queue when it resets, so workers only ever take requests that
+    can go out now instead of sleeping on one while others wait behind it.
+    A 429 that happens anyway is retried after Retry-After, so deliveries are
+    delayed rather than dropped. Other failures are retried with backoff,
+    except for a POST that may have been received, which is returned to the
+    caller rather than risk posting the message twice.
+    """
+
+    def __init__(self, send, workers=8, global_rate=50, max_retries=5):
+        self.send = send
+        self.worker_count = workers
+        self.global_interval = 1 / global_rate
+        self.max_retries = max_retries
+        self.queue = None
+        self.workers = []
+        self.counter = itertools.count()
+        self.route_buckets = {}
+        self.buckets = {}
+        self.next_global_time = 0
+        self.global_reset_at = 0
+        self.global_bucket = Bucket()
+        self.requests = {}
+        self.rate_limited = {}
+
+    def start(self):
+        self.queue = asyncio.PriorityQueue()
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(self.worker_count)]
+
+    async def submit(self, method, url, json=None, params=None, priority=EDIT_PRIORITY):
+        if self.queue is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((priority, next(self.counter), method, url, json, params, future, 0))
+        return await future
+
+    def get_bucket(self, route_key):
+        bucket_key = self.route_buckets.get(route_key, route_key)
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            bucket = Bucket()
+            self.buckets[bucket_key] = bucket
+        return bucket
+
+    def take_capacity(self, bucket, now):
+        """Use up one request of `bucket`, or return the time it has room again."""
+        if bucket.remaining <= 0:
+            if bucket.reset_at > now:
+                return bucket.reset_at
+            # The window has passed, start a new one with the last limits Discord reported
+            bucket.remaining = bucket.limit
+            bucket.reset_at = now + bucket.window
+        bucket.remaining -= 1
+        return None
+
+    def park(self, bucket, item, ready_at):
+        bucket.waiting.append(item)
+        if bucket.release is None:
+            loop = asyncio.get_running_loop()
+            bucket.release = loop.call_later(max(0, ready_at - loop.time()), self.release, bucket)
+
+    def release(self, bucket):
+        # Back in the queue, the requests go out in priority order with everything else
+        bucket.release = None
+        waiting, bucket.waiting = bucket.waiting, []
+        if self.queue is not None:
+            for item in waiting:
+                self.queue.put_nowait(item)
+
+    async def space_out(self):
+        # Spread requests evenly under the global limit
+        loop = asyncio.get_running_loop()
+        start_time = max(loop.time(), self.next_global_time)
+        self.next_global_time = start_time + self.global_interval
+        if start_time > loop.time():
+            await asyncio.sleep(start_time - loop.time())
+
+    def update_bucket(self, route_key, bucket, headers):
+        loop = asyncio.get_running_loop()
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash:
+            bucket_key = f"{bucket_hash}:{get_major_parameter(route_key)}"
+            if self.route_buckets.get(route_key) != bucket_key:
+                self.route_buckets[route_key] = bucket_key
+                bucket = self.buckets.setdefault(bucket_key, bucket)
+
+        if 'X-RateLimit-Limit' in headers:
+            bucket.limit = int(headers['X-RateLimit-Limit'])
+        if 'X-RateLimit-Remaining' in headers:
+            bucket.remaining = min(bucket.remaining, int(headers['X-RateLimit-Remaining']))
+        if 'X-RateLimit-Reset-After' in headers:
+            reset_after = float(headers['X-RateLimit-Reset-After'])
+            bucket.window = max(bucket.window, reset_after)
+            bucket.reset_at = loop.time() + reset_after
+        return bucket
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            priority, _, method, url, json, params, future, attempts = item
+            if future.done():
+                continue
+
+            route_key = get_route_key(method, url)
+            bucket = self.get_bucket(route_key)
+            now = loop.time()
+            if self.global_reset_at > now:
+                self.park(self.global_bucket, item, self.global_reset_at)
+                continue
+            ready_at = self.take_capacity(bucket, now)
+            if ready_at is not None:
+                self.park(bucket, item, ready_at)
+                continue
+
+            try:
+                await self.space_out()
+                self.requests[route_key] = self.requests.get(route_key, 0) + 1
+                status, headers, data = await self.send(method, url, json=json, params=params)
+            except aiohttp.ClientResponseError as e:
+                if e.status < 500 or attempts >= self.max_retries or not can_retry(method, e):
+                    future.set_exception(e)
+                else:
+                    self.retry_later(item, 2 ** attempts)
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempts >= self.max_retries or not can_retry(method, e):
+                    future.set_exception(e)
+                else:
+                    self.retry_later(item, 2 ** attempts)
+                continue
+            except Exception as e:
+                future.set_exception(e)
+                continue
+
+            bucket = self.update_bucket(route_key, bucket, headers)
+            if status != 429:
+                future.set_result(data)
+                continue
+
+            # Rate limited anyway: hold the bucket (or everything, for the global limit) and requeue
+            self.rate_limited[route_key] = self.rate_limited.get(route_key, 0) + 1
+            # The body has the precise value, the header is rounded up to whole seconds
+            retry_after = float((data or {}).get('retry_after') or headers.get('Retry-After') or 1)
+            if headers.get('X-RateLimit-Global') or (data or {}).get('global'):
+                self.global_reset_at = loop.time() + retry_after
+            else:
+                bucket.remaining = 0
+                bucket.reset_at = loop.time() + retry_after
+            await self.queue.put(item)
+
+    def retry_later(self, item, delay):
+        priority, order, method, url, json, params, future, attempts = item
+        retry_item = (priority, order, method, url, json, params, future, attempts + 1)
+        asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, retry_item)
+
+    async def close(self):
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+        for bucket in list(self.buckets.values()) + [self.global_bucket]:
+            if bucket.release is not None:
+                bucket.release.cancel()
+                bucket.release = None
+        self.queue = None
@@ -0,0 +1,58 @@
+from collections import namedtuple
+from parsers import parsers
+
+GuildRoute = namedtuple('GuildRoute', [
+    'guild_id',
+    'unpin_time',
+    'thread_deletion_time',
+    'invite_link',
+    'force_thread_creation',
+    'webhooks'
+])
+
+class RoutingTable:
+    """Precomputed admission table for incoming messages and edits.
+
+    Built from the bot's ConfigSnapshot and rebuilt only when its version
+    changes, so deciding whether a message is relevant costs a version check
+    and a couple of hash lookups, with no disk access.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.version = None
+        self.channel_guilds = {}
+        self.authors = frozenset()
+        self.guilds = {}
+
+    def build_route(self, guild_id):
+        config = self.bot.config
+        settings = config.settings.get(str(guild_id), {})
+        return GuildRoute(
+            guild_id,
+            settings.get('unpin_time', 60),
+            settings.get('thread_deletion_time', 60),
+            settings.get('invite_link', 'https://discord.com/'),
+            settings.get('force_thread_creation', False),
+            config.webhooks.get(guild_id, ())
+        )
+
+    def refresh(self):
+        config = self.bot.config
+        if config is None or config.version == self.version:
+            return
+
+        self.channel_guilds = {channel_id: guild_id for guild_id, channels in config.monitored_channels.items()
+                               for channel_id in channels}
+        self.authors = frozenset(parsers)
+        self.guilds = {guild_id: self.build_route(guild_id) for guild_id in config.monitored_channels}
+        self.version = config.version
+
+    def route(self, message):
+        """Return the GuildRoute for a message from a source bot in a monitored channel, otherwise None."""
+        self.refresh()
+        if message.author.id not in self.authors or message.guild is None:
+            return None
+        if self.channel_guilds.get(message.channel.id) != message.guild.id:
+            return None
+        return self.guilds.get(message.guild.id)
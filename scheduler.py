@@ -0,0 +1,195 @@
+import time
+import heapq
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+from functions import get_task_due_time
+
+class TaskScheduler:
+    """Min-heap of pending tasks keyed on their due time.
+
+    Cancelled tasks are only marked as removed and skipped once they reach
+    the top of the heap, so cancelling never has to search the heap.
+
+    Tasks that fell due while the bot was down are caught up on once per
+    process before the regular loop starts: most overdue first, at
+    `catch_up_rate` tasks per second, and behind any live messages.
+    """
+
+    def __init__(self, bot, retry_delay=60, coalesce_window=5, catch_up_rate=3, progress_interval=30):
+        self.bot = bot
+        self.retry_delay = retry_delay
+        self.coalesce_window = coalesce_window
+        self.catch_up_rate = catch_up_rate
+        self.progress_interval = progress_interval
+        self.catch_up_remaining = 0
+        self.heap = []
+        self.entries = {}
+        self.guild_counts = {}
+        self.counter = itertools.count()
+        self.wakeup = None
+        self.lag = timedelta(0)
+        self.max_lag = timedelta(0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def schedule(self, guild_id, task, due_time=None):
+        if due_time is None:
+            due_time = get_task_due_time(task)
+        self.discard(task)
+
+        entry = [due_time, next(self.counter), guild_id, task]
+        self.entries[id(task)] = entry
+        self.count_entry(guild_id, 1)
+        heapq.heappush(self.heap, entry)
+
+        # Wake the runner early if this task is now the next one due
+        if self.heap[0] is entry and self.wakeup is not None:
+            self.wakeup.set()
+
+    def schedule_many(self, tasks):
+        new_entries = []
+        for guild_id, guild_tasks in tasks.items():
+            for task in guild_tasks:
+                self.discard(task)
+                entry = [get_task_due_time(task), next(self.counter), guild_id, task]
+                self.entries[id(task)] = entry
+                new_entries.append(entry)
+            if guild_tasks:
+                self.count_entry(guild_id, len(guild_tasks))
+
+        # Pushing a small batch onto a large heap is cheaper than heapifying all of it again
+        if len(new_entries) * 16 < len(self.heap):
+            for entry in new_entries:
+                heapq.heappush(self.heap, entry)
+        else:
+            self.heap.extend(new_entries)
+            heapq.heapify(self.heap)
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def discard(self, task):
+        entry = self.entries.pop(id(task), None)
+        if entry is not None:
+            entry[-1] = None
+            self.count_entry(entry[2], -1)
+
+    def count_entry(self, guild_id, change):
+        count = self.guild_counts.get(guild_id, 0) + change
+        if count:
+            self.guild_counts[guild_id] = count
+        else:
+            del self.guild_counts[guild_id]
+
+    def clear(self):
+        self.heap = []
+        self.entries = {}
+        self.guild_counts = {}
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def next_due_time(self):
+        while self.heap and self.heap[0][-1] is None:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None, limit=None):
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # Tasks due a few seconds from now are fired with this batch so they can be coalesced
+        deadline = now + timedelta(seconds=self.coalesce_window)
+
+        due_tasks = []
+        while self.heap and self.heap[0][0] <= deadline and (limit is None or len(due_tasks) < limit):
+            due_time, _, guild_id, task = heapq.heappop(self.heap)
+            if task is None:
+                continue
+            del self.entries[id(task)]
+            self.count_entry(guild_id, -1)
+            due_tasks.append((guild_id, task))
+
+            if due_time <= now:
+                self.lag = now - due_time
+                self.bot.metrics.scheduler_lag_seconds.observe(self.lag.total_seconds())
+                if self.lag > self.max_lag:
+                    self.max_lag = self.lag
+
+        return due_tasks
+
+    def count_due(self, now):
+        return sum(1 for entry in self.entries.values() if entry[0] <= now)
+
+    def backlog(self):
+        # Kept up to date as tasks come and go, so a metrics scrape does not walk the heap
+        return dict(self.guild_counts)
+
+    def retry(self, guild_id, task, now=None):
+        if now is None:
+            now = datetime.now(timezone.utc)
+        self.schedule(guild_id, task, now + timedelta(seconds=self.retry_delay))
+
+    async def wait_for_live_work(self, timeout=1):
+        # Live messages go first, but a steady stream of them only slows the drain down, never stops it
+        deadline = time.monotonic() + timeout
+        while self.bot.active_messages and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def catch_up(self):
+        total = self.count_due(datetime.now(timezone.utc))
+        if not total:
+            return
+        print(f"Catching up on {total} overdue task(s) at {self.catch_up_rate} per second.")
+
+        # One second of work per batch, heap order runs the most overdue tasks first
+        batch_size = max(1, int(self.catch_up_rate))
+        done = 0
+        self.catch_up_remaining = total
+        last_report = time.monotonic()
+        while not self.bot.is_closed():
+            await self.wait_for_live_work()
+            start_time = time.monotonic()
+            due_tasks = self.pop_due(limit=batch_size)
+            if not due_tasks:
+                break
+            try:
+                await self.bot.run_due_tasks(due_tasks)
+            except Exception as e:
+                print(f"Error catching up on overdue tasks: {e}")
+
+            done += len(due_tasks)
+            self.catch_up_remaining = max(total - done, 0)
+            if time.monotonic() - last_report >= self.progress_interval:
+                print(f"Caught up on {done}/{total} overdue task(s).")
+                last_report = time.monotonic()
+            await asyncio.sleep(max(0, start_time + len(due_tasks) / self.catch_up_rate - time.monotonic()))
+
+        self.catch_up_remaining = 0
+        print(f"Finished catching up on {done} overdue task(s).")
+
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        await self.bot.wait_until_ready()
+        await self.catch_up()
+
+        while not self.bot.is_closed():
+            self.wakeup.clear()
+            next_due = self.next_due_time()
+
+            if next_due is None:
+                await self.wakeup.wait()
+            else:
+                timeout = (next_due - datetime.now(timezone.utc)).total_seconds()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            next_due = self.next_due_time()
+            if next_due is not None and next_due <= datetime.now(timezone.utc):
+                try:
+                    await self.bot.reschedule_tasks()
+                except Exception as e:
+                    print(f"Error running scheduled tasks: {e}")
@@ -0,0 +1,118 @@
+import time
+import sqlite3
+from collections import OrderedDict
+
+class SentMessageIndex:
+    """Maps original message IDs to the webhook copies made of them.
+
+    Recently used entries are kept in memory in LRU order under a hard size
+    cap, and every copy is also written to a small SQLite file so edits can
+    still be mirrored after a restart. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, db_file="sent_messages.db", max_entries=10000, ttl=7 * 24 * 3600, prune_interval=1000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+        self.connection = sqlite3.connect(db_file)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS sent_messages (
+                    original_id INTEGER NOT NULL,
+                    webhook_message_id INTEGER NOT NULL,
+                    webhook_url TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (original_id, webhook_message_id)
+                );
+                CREATE INDEX IF NOT EXISTS sent_messages_created_at ON sent_messages (created_at);
+            """)
+        self.prune()
+
+    def __contains__(self, original_id):
+        return self.lookup(original_id) is not None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def remember(self, original_id, created_at, copies):
+        self.entries[original_id] = (created_at, copies)
+        self.entries.move_to_end(original_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def reserve(self, original_id):
+        """Claim a message for forwarding; returns False when it was already forwarded."""
+        # Looked up without counting, a new message is not a cache miss
+        if original_id in self:
+            return False
+        self.remember(original_id, time.time(), set())
+        return True
+
+    def get(self, original_id):
+        copies = self.lookup(original_id)
+        if copies is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return copies
+
+    def lookup(self, original_id):
+        entry = self.entries.get(original_id)
+        if entry is not None:
+            created_at, copies = entry
+            if created_at + self.ttl > time.time():
+                self.entries.move_to_end(original_id)
+                return copies
+            del self.entries[original_id]
+
+        # Fall back to the on-disk store for messages evicted from memory or sent before a restart
+        rows = self.connection.execute(
+            "SELECT webhook_message_id, webhook_url, created_at FROM sent_messages WHERE original_id = ? AND created_at > ?",
+            (original_id, time.time() - self.ttl)
+        ).fetchall()
+        if not rows:
+            return None
+
+        copies = {(str(webhook_message_id), webhook_url) for webhook_message_id, webhook_url, _ in rows}
+        self.remember(original_id, min(created_at for _, _, created_at in rows), copies)
+        return copies
+
+    def add(self, original_id, webhook_message_id, webhook_url):
+        entry = self.entries.get(original_id)
+        if entry is None:
+            self.remember(original_id, time.time(), set())
+            entry = self.entries[original_id]
+        entry[1].add((webhook_message_id, webhook_url))
+
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO sent_messages (original_id, webhook_message_id, webhook_url, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (original_id, int(webhook_message_id), webhook_url, entry[0])
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to store sent webhook message {webhook_message_id}: {e}")
+
+        self.writes += 1
+        if self.writes % self.prune_interval == 0:
+            self.prune()
+
+    def prune(self):
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM sent_messages WHERE created_at <= ?", (time.time() - self.ttl,))
+        except sqlite3.Error as e:
+            print(f"Failed to prune sent webhook messages: {e}")
+
+    def close(self):
+        self.connection.close()
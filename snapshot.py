@@ -0,0 +1,135 @@
+import os
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functions import get_task_due_time
+
+MAGIC = b"PBTS"
+VERSION = 2
+TASK_TYPES = ('unpin', 'thread_deletion')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# magic, version, padding, generation, task count, highest task ID
+header_struct = struct.Struct("<4sHHQQQ")
+# Version 1 snapshots were written before tasks had IDs
+v1_header_struct = struct.Struct("<4sHHQQ4x")
+COLUMNS = {1: (('q', 8), ('Q', 8), ('Q', 8), ('Q', 8), ('B', 1), ('B', 1)),
+           2: (('q', 8), ('Q', 8), ('Q', 8), ('Q', 8), ('Q', 8), ('B', 1), ('B', 1))}
+
+def to_epoch_us(date_time):
+    return (date_time - EPOCH) // timedelta(microseconds=1)
+
+def write_task_snapshot(tasks, snapshot_file, generation=0):
+    """Write tasks as one column per field, sorted by due time, so a prefix of due tasks can be read alone.
+
+    Layout: a 32 byte header, then the due times (int64 microseconds since the
+    epoch), guild, channel, message/thread and task IDs (uint64), then the
+    types and retry counts (uint8).
+    """
+    try:
+        rows = sorted(
+            (to_epoch_us(get_task_due_time(task)), int(guild_id), TASK_TYPES.index(task['type']), task['channel_id'],
+             task['message_id'] if task['type'] == 'unpin' else task['thread_id'], task['id'],
+             min(task['retries'], 255))
+            for guild_id, guild_tasks in tasks.items() for task in guild_tasks
+        )
+        due_times, guild_ids, types, channel_ids, target_ids, task_ids, retries = zip(*rows) if rows else ((),) * 7
+
+        temp_file = f"{snapshot_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(header_struct.pack(MAGIC, VERSION, 0, generation, len(rows), max(task_ids, default=0)))
+            for typecode, column in (('q', due_times), ('Q', guild_ids), ('Q', channel_ids), ('Q', target_ids),
+                                     ('Q', task_ids), ('B', types), ('B', retries)):
+                array(typecode, column).tofile(f)
+        os.replace(temp_file, snapshot_file)
+        return True
+    except Exception as e:
+        print(f"Failed to save task snapshot: {e}")
+        return False
+
+class TaskSnapshot:
+    """Memory-mapped view of a task snapshot file.
+
+    Opening it only reads the header; rows become task dicts when a range of
+    them is materialized, and the due time column is sorted so the tasks due
+    before any moment are a prefix found by bisection.
+    """
+
+    def __init__(self, snapshot_file):
+        self.file = open(snapshot_file, 'rb')
+        self.map = None
+        self.columns = []
+        self.max_id = 0
+        try:
+            header = self.file.read(header_struct.size)
+            magic, self.version = struct.unpack_from("<4sH", header) if len(header) >= 6 else (None, None)
+            if magic != MAGIC or self.version not in COLUMNS:
+                raise ValueError(f"{snapshot_file} is not a task snapshot this version can read")
+            if self.version == 1:
+                _, _, _, self.generation, self.count = v1_header_struct.unpack_from(header)
+                offset = v1_header_struct.size
+            else:
+                _, _, _, self.generation, self.count, self.max_id = header_struct.unpack(header)
+                offset = header_struct.size
+            # A short or padded file means a torn write, reading it would misplace every column after the tear
+            expected_size = offset + self.count * sum(size for _, size in COLUMNS[self.version])
+            if os.fstat(self.file.fileno()).st_size != expected_size:
+                raise ValueError(f"{snapshot_file} is not the size its header says")
+            if self.count:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(self.map)
+                for typecode, size in COLUMNS[self.version]:
+                    self.columns.append(view[offset:offset + self.count * size].cast(typecode))
+                    offset += self.count * size
+                view.release()
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def index_after(self, date_time):
+        """Index of the first row due after `date_time`."""
+        if not self.count:
+            return 0
+        return bisect_right(self.columns[0], to_epoch_us(date_time))
+
+    def materialize(self, start, stop, tasks=None):
+        if tasks is None:
+            tasks = {}
+        if start >= stop:
+            return tasks
+        columns = [column[start:stop] for column in self.columns]
+        if self.version == 1:
+            columns.insert(4, [None] * (stop - start))
+        due_times, guild_ids, channel_ids, target_ids, task_ids, types, retries = columns
+        by_guild = {}
+        for due_time, guild_id, task_type, channel_id, target_id, task_id, task_retries in zip(
+                due_times, guild_ids, types, channel_ids, target_ids, task_ids, retries):
+            due_time = EPOCH + timedelta(microseconds=due_time)
+            if task_type == 0:
+                task = {'type': 'unpin', 'channel_id': channel_id, 'message_id': target_id,
+                        'unpin_time': due_time, 'retries': task_retries, 'id': task_id}
+            else:
+                task = {'type': 'thread_deletion', 'channel_id': channel_id, 'thread_id': target_id,
+                        'thread_deletion_time': due_time, 'retries': task_retries, 'id': task_id}
+            guild_tasks = by_guild.get(guild_id)
+            if guild_tasks is None:
+                guild_tasks = by_guild[guild_id] = []
+            guild_tasks.append(task)
+
+        for guild_id, guild_tasks in by_guild.items():
+            tasks.setdefault(str(guild_id), []).extend(guild_tasks)
+        return tasks
+
+    def close(self):
+        for column in self.columns:
+            column.release()
+        self.columns = []
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
@@ -0,0 +1,398 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta, timezone
+from journal import TaskJournal
+from functions import (
+    load_monitored_channels,
+    save_monitored_channels,
+    load_settings,
+    save_settings,
+    load_webhooks,
+    save_webhooks,
+    get_task_due_time
+)
+
+def get_file_sizes(files):
+    sizes = {}
+    for file in files:
+        try:
+            sizes[file] = os.path.getsize(file)
+        except OSError:
+            pass
+    return sizes
+
+class JsonStorage:
+    """The original storage layout: one JSON file per kind of data, with tasks in a binary snapshot and journal."""
+
+    def __init__(self, data_file="monitored_channels.json", settings_file="settings.json",
+                 webhooks_file="webhooks.json", tasks_file="tasks.json"):
+        self.data_file = data_file
+        self.settings_file = settings_file
+        self.webhooks_file = webhooks_file
+        self.tasks_file = tasks_file
+        self.journal = TaskJournal(tasks_file)
+
+    def load_monitored_channels(self):
+        return load_monitored_channels(self.data_file)
+
+    def save_monitored_channels(self, monitored_channels):
+        save_monitored_channels(monitored_channels, self.data_file)
+
+    def load_settings(self):
+        return load_settings(self.settings_file)
+
+    def save_settings(self, settings):
+        save_settings(settings, self.settings_file)
+
+    def load_webhooks(self):
+        return load_webhooks(self.webhooks_file)
+
+    def save_webhooks(self, webhooks):
+        save_webhooks(webhooks, self.webhooks_file)
+
+    def config_file(self, name):
+        return {'monitored_channels': self.data_file, 'settings': self.settings_file,
+                'webhooks': self.webhooks_file}[name]
+
+    def config_signature(self, name):
+        try:
+            stat = os.stat(self.config_file(name))
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def config_digest(self, name):
+        try:
+            with open(self.config_file(name), 'rb') as file:
+                return hashlib.sha1(file.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def load_config(self, name):
+        return getattr(self, f"load_{name}")()
+
+    def save_config(self, name, data, guild_ids):
+        # Each kind of config is one file, so it is always written whole
+        getattr(self, f"save_{name}")(data)
+
+    def file_sizes(self):
+        return get_file_sizes([self.data_file, self.settings_file, self.webhooks_file, self.tasks_file,
+                               self.journal.snapshot_file, self.journal.journal_file])
+
+    def load_tasks(self, horizon=None, read_only=False):
+        return self.journal.load(horizon, read_only)
+
+    def has_pending_tasks(self):
+        return self.journal.has_pending()
+
+    def load_pending_tasks(self, chunk_size=20000):
+        return self.journal.load_pending(chunk_size)
+
+    def max_task_id(self):
+        return self.journal.max_id
+
+    def save_tasks(self, tasks):
+        self.journal.compact(tasks)
+
+    def record_tasks(self, tasks, added=(), removed=(), updated=()):
+        for guild_id, task in added:
+            self.journal.append_add(guild_id, task)
+        self.journal.append_remove(removed)
+        self.journal.append_update(updated)
+        self.journal.maybe_compact(tasks)
+
+    def close(self):
+        self.journal.close()
+
+class SQLiteStorage:
+    """Embedded SQLite storage for channels, settings, webhooks and tasks.
+
+    Tasks are stored one per row, keyed by task ID, with indexes on due time,
+    guild, message and thread, and every batch of task changes is written in a
+    single transaction.
+    """
+
+    def __init__(self, db_file="pinbot.db"):
+        self.db_file = db_file
+        self.connection = sqlite3.connect(db_file)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.pending_after = None
+        self.create_tables()
+
+    def create_tables(self):
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS monitored_channels (
+                    guild_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    PRIMARY KEY (guild_id, channel_id)
+                );
+                CREATE TABLE IF NOT EXISTS settings (
+                    guild_id TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, key)
+                );
+                CREATE TABLE IF NOT EXISTS webhooks (
+                    guild_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, position)
+                );
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    guild_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER,
+                    thread_id INTEGER,
+                    due_time INTEGER NOT NULL,
+                    retries INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS tasks_due_time ON tasks (due_time);
+                CREATE INDEX IF NOT EXISTS tasks_guild_id ON tasks (guild_id);
+                CREATE INDEX IF NOT EXISTS tasks_message_id ON tasks (message_id);
+                CREATE INDEX IF NOT EXISTS tasks_thread_id ON tasks (thread_id);
+                CREATE TABLE IF NOT EXISTS config_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            # Every write to a config table, from any connection, moves its version, and task writes never do
+            for name in ('monitored_channels', 'settings', 'webhooks'):
+                self.connection.execute("INSERT OR IGNORE INTO config_versions (name) VALUES (?)", (name,))
+                for event in ('INSERT', 'UPDATE', 'DELETE'):
+                    self.connection.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {name}_{event.lower()} AFTER {event} ON {name} "
+                        f"BEGIN UPDATE config_versions SET version = version + 1 WHERE name = '{name}'; END")
+
+    def load_monitored_channels(self):
+        monitored_channels = {}
+        for guild_id, channel_id in self.connection.execute(
+                "SELECT guild_id, channel_id FROM monitored_channels ORDER BY rowid"):
+            monitored_channels.setdefault(guild_id, []).append(channel_id)
+        return monitored_channels
+
+    def save_monitored_channels(self, monitored_channels):
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM monitored_channels")
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO monitored_channels (guild_id, channel_id) VALUES (?, ?)",
+                    [(int(guild_id), int(channel_id)) for guild_id, channels in monitored_channels.items()
+                     for channel_id in channels]
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to save monitored channels: {e}")
+
+    def load_settings(self):
+        settings = {}
+        for guild_id, key, value in self.connection.execute("SELECT guild_id, key, value FROM settings"):
+            settings.setdefault(guild_id, {})[key] = json.loads(value)
+        return settings
+
+    def save_settings(self, settings):
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM settings")
+                self.connection.executemany(
+                    "INSERT INTO settings (guild_id, key, value) VALUES (?, ?, ?)",
+                    [(str(guild_id), key, json.dumps(value)) for guild_id, guild_settings in settings.items()
+                     for key, value in guild_settings.items()]
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to save settings: {e}")
+
+    def load_webhooks(self):
+        webhooks = {}
+        for guild_id, url in self.connection.execute("SELECT guild_id, url FROM webhooks ORDER BY guild_id, position"):
+            webhooks.setdefault(guild_id, []).append(url)
+        return webhooks
+
+    def save_webhooks(self, webhooks):
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM webhooks")
+                self.connection.executemany(
+                    "INSERT INTO webhooks (guild_id, position, url) VALUES (?, ?, ?)",
+                    [(int(guild_id), position, url) for guild_id, urls in webhooks.items()
+                     for position, url in enumerate(urls)]
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to save webhooks: {e}")
+
+    def config_signature(self, name):
+        return self.connection.execute("SELECT version FROM config_versions WHERE name = ?", (name,)).fetchone()[0]
+
+    def config_digest(self, name):
+        return hashlib.sha1(json.dumps(self.load_config(name), sort_keys=True).encode()).hexdigest()
+
+    def load_config(self, name):
+        return getattr(self, f"load_{name}")()
+
+    def save_config(self, name, data, guild_ids):
+        """Rewrite the rows of only `guild_ids`, on a connection of its own so it can run from a worker thread."""
+        rows = {
+            'monitored_channels': lambda guild_id: [(guild_id, channel_id) for channel_id in data.get(guild_id, ())],
+            'settings': lambda guild_id: [(str(guild_id), key, json.dumps(value))
+                                          for key, value in data.get(str(guild_id), {}).items()],
+            'webhooks': lambda guild_id: [(guild_id, position, url)
+                                          for position, url in enumerate(data.get(guild_id, ()))],
+        }[name]
+        insert = {
+            'monitored_channels': "INSERT OR IGNORE INTO monitored_channels (guild_id, channel_id) VALUES (?, ?)",
+            'settings': "INSERT INTO settings (guild_id, key, value) VALUES (?, ?, ?)",
+            'webhooks': "INSERT INTO webhooks (guild_id, position, url) VALUES (?, ?, ?)",
+        }[name]
+
+        connection = sqlite3.connect(self.db_file)
+        try:
+            with connection:
+                for guild_id in guild_ids:
+                    connection.execute(f"DELETE FROM {name} WHERE guild_id = ?",
+                                       (str(guild_id) if name == 'settings' else guild_id,))
+                    connection.executemany(insert, rows(guild_id))
+        except sqlite3.Error as e:
+            print(f"Failed to save {name}: {e}")
+        finally:
+            connection.close()
+
+    def file_sizes(self):
+        return get_file_sizes([self.db_file, self.db_file + "-wal"])
+
+    def row_to_task(self, row):
+        task_id, guild_id, task_type, channel_id, message_id, thread_id, due_time, retries = row
+        due_time = datetime.fromtimestamp(due_time // 1000000, timezone.utc).replace(microsecond=due_time % 1000000)
+        if task_type == 'unpin':
+            task = {'type': task_type, 'channel_id': channel_id, 'message_id': message_id,
+                    'unpin_time': due_time, 'retries': retries, 'id': task_id}
+        else:
+            task = {'type': task_type, 'channel_id': channel_id, 'thread_id': thread_id,
+                    'thread_deletion_time': due_time, 'retries': retries, 'id': task_id}
+        return guild_id, task
+
+    def task_to_row(self, guild_id, task):
+        due_time = get_task_due_time(task)
+        due_time = int(due_time.replace(microsecond=0).timestamp()) * 1000000 + due_time.microsecond
+        return (str(guild_id), task['type'], task['channel_id'], task.get('message_id'),
+                task.get('thread_id'), due_time, task['retries'])
+
+    def select_tasks(self, where="", parameters=()):
+        return [self.row_to_task(row) for row in self.connection.execute(
+            "SELECT id, guild_id, type, channel_id, message_id, thread_id, due_time, retries "
+            f"FROM tasks {where}", parameters)]
+
+    def load_tasks(self, horizon=None, read_only=False):
+        self.pending_after = None
+        if horizon is None:
+            rows = self.select_tasks("ORDER BY id")
+        else:
+            # Rows due after the horizon are left for load_pending_tasks, up to the last row that exists now
+            cutoff = datetime.now(timezone.utc) + timedelta(seconds=horizon)
+            cutoff = int(cutoff.replace(microsecond=0).timestamp()) * 1000000 + cutoff.microsecond
+            max_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+            rows = self.select_tasks("WHERE due_time <= ? ORDER BY id", (cutoff,))
+            self.pending_after = (cutoff, cutoff, 0, max_id)
+
+        tasks = {}
+        for guild_id, task in rows:
+            tasks.setdefault(guild_id, []).append(task)
+        return tasks
+
+    def has_pending_tasks(self):
+        return self.pending_after is not None
+
+    def load_pending_tasks(self, chunk_size=20000):
+        if self.pending_after is None:
+            return {}
+        # Chunks go in due time order, like the JSON snapshot's, so each one extends the task index at its end
+        cutoff, last_due_time, last_id, max_id = self.pending_after
+        rows = self.select_tasks("WHERE due_time > ? AND id <= ? AND (due_time, id) > (?, ?) "
+                                 "ORDER BY due_time, id LIMIT ?", (cutoff, max_id, last_due_time, last_id, chunk_size))
+        if len(rows) < chunk_size:
+            self.pending_after = None
+        else:
+            self.pending_after = (cutoff, self.task_to_row(*rows[-1])[5], rows[-1][1]['id'], max_id)
+
+        tasks = {}
+        for guild_id, task in rows:
+            tasks.setdefault(guild_id, []).append(task)
+        return tasks
+
+    def save_tasks(self, tasks):
+        if self.pending_after is not None:
+            print("Not saving tasks while some are still being loaded.")
+            return
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM tasks")
+                for guild_id, guild_tasks in tasks.items():
+                    for task in guild_tasks:
+                        self.insert_task(guild_id, task)
+        except sqlite3.Error as e:
+            print(f"Failed to save tasks: {e}")
+
+    def insert_task(self, guild_id, task):
+        self.connection.execute(
+            "INSERT INTO tasks (id, guild_id, type, channel_id, message_id, thread_id, due_time, retries) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (task['id'],) + self.task_to_row(guild_id, task))
+
+    def max_task_id(self):
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+
+    def record_tasks(self, tasks, added=(), removed=(), updated=()):
+        try:
+            with self.connection:
+                for guild_id, task in added:
+                    self.insert_task(guild_id, task)
+                self.connection.executemany("DELETE FROM tasks WHERE id = ?", [(task['id'],) for _, task in removed])
+                self.connection.executemany(
+                    "UPDATE tasks SET due_time = ?, retries = ? WHERE id = ?",
+                    [self.task_to_row(guild_id, task)[5:] + (task['id'],) for guild_id, task in updated]
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to record task changes: {e}")
+
+    def close(self):
+        self.connection.close()
+
+def create_storage(backend="json", data_dir="."):
+    if backend == "sqlite":
+        return SQLiteStorage(os.path.join(data_dir, "pinbot.db"))
+    return JsonStorage(os.path.join(data_dir, "monitored_channels.json"), os.path.join(data_dir, "settings.json"),
+                       os.path.join(data_dir, "webhooks.json"), os.path.join(data_dir, "tasks.json"))
+
+def migrate_json_to_sqlite(db_file="pinbot.db", data_file="monitored_channels.json", settings_file="settings.json",
+                           webhooks_file="webhooks.json", tasks_file="tasks.json"):
+    source = JsonStorage(data_file, settings_file, webhooks_file, tasks_file)
+    target = SQLiteStorage(db_file)
+
+    monitored_channels = source.load_monitored_channels()
+    settings = source.load_settings()
+    webhooks = source.load_webhooks()
+    tasks = source.load_tasks(read_only=True)
+    source.close()
+
+    target.save_monitored_channels(monitored_channels)
+    target.save_settings(settings)
+    target.save_webhooks(webhooks)
+    target.save_tasks(tasks)
+    target.close()
+
+    task_count = sum(len(guild_tasks) for guild_tasks in tasks.values())
+    print(f"Migrated {len(monitored_channels)} guild channel list(s), {len(settings)} guild setting(s), "
+          f"{len(webhooks)} guild webhook list(s) and {task_count} task(s) into {db_file}.")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        db_file = sys.argv[2] if len(sys.argv) > 2 else "pinbot.db"
+        if os.path.exists(db_file):
+            print(f"{db_file} already exists, remove it first to migrate again.")
+        else:
+            migrate_json_to_sqlite(db_file)
+    else:
+        print("Usage: python storage.py migrate [database file]")
@@ -0,0 +1,77 @@
+import itertools
+from bisect import bisect_left
+from functions import get_task_due_time
+
+class TaskIndex:
+    """Each guild's tasks kept sorted by due time.
+
+    Adding or removing a task is a bisection into the guild's list, so a page
+    of tasks, or the position of a moment in time, can be read without
+    looking at the rest of the guild's tasks.
+    """
+
+    def __init__(self):
+        # Per guild, a sorted list of (due time, sequence) keys and the tasks in the same order
+        self.guilds = {}
+        self.keys = {}
+        self.counter = itertools.count()
+
+    def add(self, guild_id, task):
+        if id(task) in self.keys:
+            return
+        key = (get_task_due_time(task), next(self.counter))
+        self.keys[id(task)] = key
+        guild_keys, guild_tasks = self.guilds.setdefault(str(guild_id), ([], []))
+        position = bisect_left(guild_keys, key)
+        guild_keys.insert(position, key)
+        guild_tasks.insert(position, task)
+
+    def add_many(self, tasks):
+        for guild_id, new_tasks in tasks.items():
+            new_entries = []
+            for task in new_tasks:
+                if id(task) not in self.keys:
+                    key = (get_task_due_time(task), next(self.counter))
+                    self.keys[id(task)] = key
+                    new_entries.append((key, task))
+            if not new_entries:
+                continue
+            # Chunks arrive in due time order, so this sort is a single pass and they mostly land after the last key
+            new_entries.sort(key=lambda entry: entry[0])
+            guild_keys, guild_tasks = self.guilds.setdefault(str(guild_id), ([], []))
+
+            # Only the tail that sorts after the first new key is merged, the rest of the guild is left in place
+            start = bisect_left(guild_keys, new_entries[0][0])
+            if start < len(guild_keys):
+                new_entries.extend(zip(guild_keys[start:], guild_tasks[start:]))
+                new_entries.sort(key=lambda entry: entry[0])
+                del guild_keys[start:]
+                del guild_tasks[start:]
+            guild_keys.extend(key for key, _ in new_entries)
+            guild_tasks.extend(task for _, task in new_entries)
+
+    def remove(self, guild_id, task):
+        key = self.keys.pop(id(task), None)
+        if key is None:
+            return
+        guild_id = str(guild_id)
+        guild_keys, guild_tasks = self.guilds[guild_id]
+        position = bisect_left(guild_keys, key)
+        del guild_keys[position]
+        del guild_tasks[position]
+        if not guild_keys:
+            del self.guilds[guild_id]
+
+    def clear(self):
+        self.guilds = {}
+        self.keys = {}
+
+    def count(self, guild_id):
+        return len(self.guilds.get(str(guild_id), ((), ()))[0])
+
+    def page(self, guild_id, start, size):
+        return self.guilds.get(str(guild_id), ((), ()))[1][start:start + size]
+
+    def position(self, guild_id, due_time):
+        """Index of the first task in the guild due at or after `due_time`."""
+        return bisect_left(self.guilds.get(str(guild_id), ((), ()))[0], (due_time,))
@@ -0,0 +1,88 @@
+class TaskStore:
+    """The bot's tasks by guild, with indexes by task ID, message and thread.
+
+    Guild lists stay plain lists so storage reads them as before. Each task's
+    position in its list is tracked, so removing a task moves the last task
+    of the guild into its place instead of searching or rebuilding the list.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.guild_ids = {}
+        self.positions = {}
+        self.by_message = {}
+        self.by_thread = {}
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.guild_ids)
+
+    def reset(self, tasks, next_id=1):
+        # Cleared in place, the bot hands this same dict to storage
+        self.tasks.clear()
+        self.guild_ids = {}
+        self.positions = {}
+        self.by_message = {}
+        self.by_thread = {}
+        self.next_id = next_id
+        self.add_many(tasks)
+
+    def target_index(self, task):
+        if task['type'] == 'unpin':
+            return self.by_message, task['message_id']
+        return self.by_thread, task['thread_id']
+
+    def add(self, guild_id, task):
+        guild_id = str(guild_id)
+        if task.get('id') is None or task['id'] in self.guild_ids:
+            task['id'] = self.next_id
+        self.next_id = max(self.next_id, task['id'] + 1)
+
+        guild_tasks = self.tasks.setdefault(guild_id, [])
+        self.positions[task['id']] = len(guild_tasks)
+        guild_tasks.append(task)
+        self.guild_ids[task['id']] = guild_id
+        index, target_id = self.target_index(task)
+        index.setdefault(target_id, set()).add(task['id'])
+        return task
+
+    def add_many(self, tasks):
+        for guild_id, guild_tasks in tasks.items():
+            for task in guild_tasks:
+                self.add(guild_id, task)
+
+    def get(self, task_id):
+        """Return (guild ID, task) for a task ID, or None."""
+        guild_id = self.guild_ids.get(task_id)
+        if guild_id is None:
+            return None
+        return guild_id, self.tasks[guild_id][self.positions[task_id]]
+
+    def remove(self, task_id):
+        """Remove a task by ID and return (guild ID, task), or None if it is not stored."""
+        guild_id = self.guild_ids.pop(task_id, None)
+        if guild_id is None:
+            return None
+
+        guild_tasks = self.tasks[guild_id]
+        position = self.positions.pop(task_id)
+        task = guild_tasks[position]
+        last_task = guild_tasks.pop()
+        if last_task is not task:
+            guild_tasks[position] = last_task
+            self.positions[last_task['id']] = position
+        if not guild_tasks:
+            del self.tasks[guild_id]
+
+        index, target_id = self.target_index(task)
+        task_ids = index[target_id]
+        task_ids.discard(task_id)
+        if not task_ids:
+            del index[target_id]
+        return guild_id, task
+
+    def message_task_ids(self, message_id):
+        return list(self.by_message.get(message_id, ()))
+
+    def thread_task_ids(self, thread_id):
+        return list(self.by_thread.get(thread_id, ()))
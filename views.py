@@ -1,8 +1,6 @@
 import discord
-import json
-import datetime
-from datetime import datetime
-from functions import load_settings
+from datetime import datetime, timezone
+from functions import get_task_due_time
 
 class SettingsView(discord.ui.View):
     def __init__(self, bot):
@@ -53,9 +51,10 @@ class SettingsView(discord.ui.View):
                 ephemeral=True
             )
         elif select.values[0] == "tasks":
-            guild_id = interaction.guild.id
+            view = TasksView(self.bot, interaction.guild.id)
             await interaction.response.send_message(
-                view=TasksView(self.bot, guild_id),
+                view.render(),
+                view=view,
                 ephemeral=True
             )
 
@@ -69,18 +68,16 @@ class ChannelManagementView(discord.ui.View):
         valid_channels = []
         removed_channels = []
         
-        if guild.id in self.bot.monitored_channels:
-            for channel_id in self.bot.monitored_channels[guild.id]:
-                channel = guild.get_channel(channel_id)
-                if channel:
-                    valid_channels.append(channel)
-                else:
-                    removed_channels.append(channel_id)
-            
-            if removed_channels:
-                self.bot.monitored_channels[guild.id] = [ch.id for ch in valid_channels]
-                self.bot.save_monitored_channels()
-                
+        for channel_id in self.bot.config_service.get_channels(guild.id):
+            channel = guild.get_channel(channel_id)
+            if channel:
+                valid_channels.append(channel)
+            else:
+                removed_channels.append(channel_id)
+
+        if removed_channels:
+            self.bot.config_service.remove_channels(guild.id, removed_channels)
+
         return valid_channels
 
     @discord.ui.button(label="Add Channel", style=discord.ButtonStyle.green)
@@ -132,10 +129,7 @@ class RemoveChannelView(discord.ui.View):
             channel_id = int(interaction.data["values"][0])
             guild_id = interaction.guild.id
             
-            if guild_id in self.bot.monitored_channels:
-                self.bot.monitored_channels[guild_id].remove(channel_id)
-                self.bot.save_monitored_channels()
-                
+            if self.bot.config_service.remove_channels(guild_id, [channel_id]):
                 channel = interaction.guild.get_channel(channel_id)
                 channel_text = channel.mention if channel else f"Channel {channel_id}"
                 await interaction.response.send_message(
@@ -153,9 +147,8 @@ class WebhookManagementView(discord.ui.View):
     @discord.ui.button(label="Add Webhook", style=discord.ButtonStyle.green)
     async def add_webhook(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild_id = interaction.guild.id
-        webhooks = self.bot.webhooks
-        
-        if guild_id in webhooks and webhooks[guild_id]:  
+
+        if self.bot.config_service.get_webhooks(guild_id):
             await interaction.response.send_message(
                 "⚠ A webhook link already exists for this server. \nPlease remove it before trying to add a new one.",
                 ephemeral=True
@@ -174,11 +167,10 @@ class WebhookManagementView(discord.ui.View):
 
     @discord.ui.button(label="List Webhooks", style=discord.ButtonStyle.blurple)
     async def list_webhooks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = interaction.guild.id
-        webhooks = self.bot.webhooks
-        
-        if guild_id in webhooks and webhooks[guild_id]:
-            await interaction.response.send_message(f"🔗 Webhook link for this server:\n{webhooks[guild_id][0]}", ephemeral=True)
+        webhooks = self.bot.config_service.get_webhooks(interaction.guild.id)
+
+        if webhooks:
+            await interaction.response.send_message(f"🔗 Webhook link for this server:\n{webhooks[0]}", ephemeral=True)
         else:
             await interaction.response.send_message("⚠ No webhook link found for this server.", ephemeral=True)
 
@@ -197,8 +189,7 @@ class TimingSettingsView(discord.ui.View):
 
     @discord.ui.button(label="View Settings", style=discord.ButtonStyle.secondary)
     async def view_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = str(interaction.guild.id)
-        settings = self.bot.settings.get(guild_id, {})
+        settings = self.bot.config_service.get_settings(interaction.guild.id)
 
         unpin_time = settings.get('unpin_time', '60')
         thread_deletion_time = settings.get('thread_deletion_time', '60')
@@ -216,10 +207,7 @@ class InviteManagementView(discord.ui.View):
 
     @discord.ui.button(label="Set Invite Link", style=discord.ButtonStyle.green)
     async def set_invite(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = str(interaction.guild.id)
-        settings = load_settings("settings.json")
-
-        if guild_id in settings and "invite_link" in settings[guild_id]:  
+        if "invite_link" in self.bot.config_service.get_settings(interaction.guild.id):
             await interaction.response.send_message(
                 "⚠ An invite link already exists for this server. \nRemove it before trying to add a new one.",
                 ephemeral=True
@@ -238,11 +226,10 @@ class InviteManagementView(discord.ui.View):
 
     @discord.ui.button(label="View Invite Link", style=discord.ButtonStyle.blurple)
     async def view_invite(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = str(interaction.guild.id)
-        settings = load_settings("settings.json")
+        settings = self.bot.config_service.get_settings(interaction.guild.id)
 
-        if guild_id in settings and "invite_link" in settings[guild_id]:
-            await interaction.response.send_message(f"🔗 Invite link for this server: \n{settings[guild_id]['invite_link']}", ephemeral=True)
+        if "invite_link" in settings:
+            await interaction.response.send_message(f"🔗 Invite link for this server: \n{settings['invite_link']}", ephemeral=True)
         else:
             await interaction.response.send_message("⚠ No invite link set.", ephemeral=True)
 
@@ -261,295 +248,125 @@ class ThreadSettingsView(discord.ui.View):
 
     @discord.ui.button(label="View Status", style=discord.ButtonStyle.blurple)
     async def view_status(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = str(interaction.guild.id)
-        
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-        
-        if guild_id not in settings or 'force_thread_creation' not in settings[guild_id]:
+        settings = self.bot.config_service.get_settings(interaction.guild.id)
+
+        if 'force_thread_creation' not in settings:
             await interaction.response.send_message(
                 "Thread creation mode is not set for this server. Default: `False`",
                 ephemeral=True
             )
             return
         
-        enabled = settings[guild_id]['force_thread_creation']
+        enabled = settings['force_thread_creation']
         await interaction.response.send_message(
             f"Thread creation mode is currently: `{enabled}`",
             ephemeral=True
         )
 
     async def update_thread_mode(self, interaction: discord.Interaction, enabled: bool):
-        guild_id = str(interaction.guild.id)
-        
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-        
-        if guild_id not in settings:
-            settings[guild_id] = {}
-        
-        settings[guild_id]['force_thread_creation'] = enabled
-        
-        with open('settings.json', 'w') as f:
-            json.dump(settings, f, indent=4)
-        
+        self.bot.config_service.update_settings(interaction.guild.id, force_thread_creation=enabled)
+
         await interaction.response.send_message(
             f"Thread creation mode has been set to: `{enabled}`",
             ephemeral=True
         )
 
-class TasksView(discord.ui.View):
-    def __init__(self, bot, guild_id):
-        super().__init__(timeout=60)
-        self.guild_id = str(guild_id)
-        self.bot = bot
-
-    @discord.ui.button(label="Delete Unpin Task", style=discord.ButtonStyle.red)
-    async def delete_unpin_task(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.guild_id not in self.bot.tasks:
-            await interaction.response.send_message("No tasks found for this server.", ephemeral=True)
-            return
-
-        unpin_tasks = [task for task in self.bot.tasks[self.guild_id] if task['type'] == 'unpin']
+def format_task_line(guild_id, task):
+    due_time = int(get_task_due_time(task).timestamp())
+    if task['type'] == 'unpin':
+        message_link = f"https://discord.com/channels/{guild_id}/{task['channel_id']}/{task['message_id']}"
+        return f"📌 <#{task['channel_id']}> - <t:{due_time}:f>\n└ [Jump to Message]({message_link})"
+    thread_link = f"https://discord.com/channels/{guild_id}/{task['channel_id']}/{task['thread_id']}"
+    return f"🧵 <#{task['channel_id']}> - <t:{due_time}:f>\n└ [Jump to Thread]({thread_link})"
 
-        if not unpin_tasks:
-            await interaction.response.send_message("No unpin tasks found for this server.", ephemeral=True)
-            return
-
-        unique_unpin_tasks = []
-        seen_message_ids = set()
-        for task in unpin_tasks:
-            if task['message_id'] not in seen_message_ids:
-                unique_unpin_tasks.append(task)
-                seen_message_ids.add(task['message_id'])
-
-        options = []
-        for task in unique_unpin_tasks:
-            try:
-                channel = interaction.guild.get_channel(task['channel_id'])
-
-                unpin_time = task['unpin_time']
-                if isinstance(unpin_time, str):
-                    formatted_time = datetime.fromisoformat(unpin_time).strftime('%H:%M %m-%d-%Y')
-                else:
-                    formatted_time = str(unpin_time)
-
-                label = f"Channel: {channel.name if channel else '(Deleted)'} | Time: {formatted_time}"
-                description = f"Message ID: {task['message_id']}"
-
-                value = f"unpin_{task['channel_id']}_{task['message_id']}"
-
-                options.append(
-                    discord.SelectOption(
-                        label=label[:100],
-                        description=description[:100],
-                        value=value
-                    )
-                )
-            except Exception as e:
-                print(f"Error processing unpin task: {task}. Error: {e}")
-                continue
-
-        if not options:
-            await interaction.response.send_message("No valid unpin tasks found for this server.", ephemeral=True)
-            return
-
-        view = discord.ui.View()
-        select = discord.ui.Select(
-            placeholder="Select an unpin task to delete...",
-            options=options,
-            custom_id="remove_unpin_task_select"
-        )
-        view.add_item(select)
-
-        async def select_callback(interaction: discord.Interaction):
-            selected_value = interaction.data["values"][0]
-            #print(selected_value)
-            parts = selected_value.split("_")
-            #print(parts)
-            if len(parts) != 3:
-                await interaction.response.send_message("Invalid task selection.", ephemeral=True)
-                return
-
-            task_type, selected_channel_id, selected_message_id = parts
-
-            if task_type != "unpin":
-                await interaction.response.send_message("Invalid task type.", ephemeral=True)
-                return
-
-            # Remove all tasks with the selected message_id
-            self.bot.tasks[self.guild_id] = [
-                task for task in self.bot.tasks[self.guild_id]
-                if task['type'] != 'unpin' or
-                task['message_id'] != int(selected_message_id)
-            ]
-
-            if not self.bot.tasks[self.guild_id]:
-                del self.bot.tasks[self.guild_id]
-
-            self.bot.save_tasks()
-            await interaction.response.send_message("Deleted the selected unpin task.", ephemeral=True)
+class TasksView(discord.ui.View):
+    """Pages through a guild's tasks in due time order.
 
-        select.callback = select_callback
-        await interaction.response.send_message("Select an unpin task to delete:", view=view, ephemeral=True)
+    Only the visible page is read from the bot's task index and rendered, so
+    opening or turning a page costs the same however many tasks the guild has.
+    """
 
-    @discord.ui.button(label="Delete Thread Task", style=discord.ButtonStyle.red)
-    async def delete_thread_task(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.guild_id not in self.bot.tasks:
-            await interaction.response.send_message("No tasks found for this server.", ephemeral=True)
-            return
+    page_size = 10
 
-        thread_tasks = [task for task in self.bot.tasks[self.guild_id] if task['type'] == 'thread_deletion']
-
-        if not thread_tasks:
-            await interaction.response.send_message("No thread deletion tasks found for this server.", ephemeral=True)
+    def __init__(self, bot, guild_id):
+        super().__init__(timeout=300)
+        self.guild_id = str(guild_id)
+        self.bot = bot
+        self.page = 0
+        self.page_tasks = []
+        self.task_select = discord.ui.Select(placeholder="Select a task to delete...", row=1)
+        self.task_select.callback = self.delete_task
+        self.update()
+
+    def page_count(self):
+        return max(1, -(-self.bot.task_index.count(self.guild_id) // self.page_size))
+
+    def update(self):
+        self.page = max(0, min(self.page, self.page_count() - 1))
+        self.page_tasks = self.bot.task_index.page(self.guild_id, self.page * self.page_size, self.page_size)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count() - 1
+
+        self.remove_item(self.task_select)
+        if self.page_tasks:
+            options = []
+            for task in self.page_tasks:
+                channel = self.bot.get_channel(task['channel_id'])
+                task_type = "Unpin" if task['type'] == 'unpin' else "Thread deletion"
+                formatted_time = get_task_due_time(task).strftime('%H:%M %m-%d-%Y UTC')
+                target = f"Message ID: {task['message_id']}" if task['type'] == 'unpin' else f"Thread ID: {task['thread_id']}"
+                label = f"{task_type} | {channel.name if channel else '(Deleted)'} | {formatted_time}"
+                options.append(discord.SelectOption(label=label[:100], description=target[:100], value=str(task['id'])))
+            self.task_select.options = options
+            self.add_item(self.task_select)
+
+    def render(self):
+        count = self.bot.task_index.count(self.guild_id)
+        if not count:
+            return "No tasks scheduled for this server."
+
+        start = self.page * self.page_size
+        header = f"**Tasks {start + 1}-{start + len(self.page_tasks)} of {count}** (page {self.page + 1}/{self.page_count()})"
+        return "\n\n".join([header] + [format_task_line(self.guild_id, task) for task in self.page_tasks])
+
+    async def show(self, interaction: discord.Interaction, page):
+        self.page = page
+        self.update()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary, row=0)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary, row=0)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
+
+    @discord.ui.button(label="Jump to Time", style=discord.ButtonStyle.blurple, row=0)
+    async def jump_to_time(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JumpToTimeModal(self))
+
+    async def delete_task(self, interaction: discord.Interaction):
+        if self.bot.tasks_loading():
+            await self.show(interaction, self.page)
+            await interaction.followup.send("Tasks are still being loaded, try again in a moment.", ephemeral=True)
             return
 
-        unique_thread_tasks = []
-        seen_thread_ids = set()
-        for task in thread_tasks:
-            if task['thread_id'] not in seen_thread_ids:
-                unique_thread_tasks.append(task)
-                seen_thread_ids.add(task['thread_id'])
-
-        options = []
-        for task in unique_thread_tasks:
-            try:
-                channel = interaction.guild.get_channel(task['channel_id'])
-
-                thread_deletion_time = task['thread_deletion_time']
-                if isinstance(thread_deletion_time, str):
-                    formatted_time = datetime.fromisoformat(thread_deletion_time).strftime('%H:%M %m-%d-%Y')
-                else:
-                    formatted_time = str(thread_deletion_time)
-
-                label = f"Channel: {channel.name if channel else '(Deleted)'} | Time: {formatted_time}"
-                description = f"Thread ID: {task['thread_id']}"
-
-                value = f"thread-deletion_{task['channel_id']}_{task['thread_id']}"
-                #print(f"SelectOption value: {value}") 
-                options.append(
-                    discord.SelectOption(
-                        label=label[:100],
-                        description=description[:100],
-                        value=value
-                    )
-                )
-            except Exception as e:
-                print(f"Error processing thread task: {task}. Error: {e}")
-                continue
-
-        if not options:
-            await interaction.response.send_message("No valid thread deletion tasks found for this server.", ephemeral=True)
+        found = self.bot.get_task(int(self.task_select.values[0]))
+        if found is None:
+            await self.show(interaction, self.page)
+            await interaction.followup.send("That task has already run or been deleted.", ephemeral=True)
             return
 
-        view = discord.ui.View()
-        select = discord.ui.Select(
-            placeholder="Select a thread task to delete...",
-            options=options,
-            custom_id="remove_thread_task_select"
-        )
-        view.add_item(select)
-
-        async def select_callback(interaction: discord.Interaction):
-            selected_value = interaction.data["values"][0]
-            #print(f"Selected value: {selected_value}")  # Debug print
-            parts = selected_value.split("_")
-            #print(parts)
-            #print(len(parts))
-            # Ensure there are exactly 3 parts
-            if len(parts) != 3:
-                await interaction.response.send_message("Invalid task selection.", ephemeral=True)
-                return
-
-            task_type, selected_channel_id, selected_thread_id = parts
-
-            #print(task_type)
-            # Ensure the task type is correct
-            if task_type != "thread-deletion":
-                await interaction.response.send_message("Invalid task type.", ephemeral=True)
-                return
-
-            # Convert selected_thread_id to integer for comparison
-            selected_thread_id = int(selected_thread_id)
-
-            # Debug: Print tasks before deletion
-            #print(f"Tasks before deletion: {self.bot.tasks[self.guild_id]}")
-
-            # Remove all tasks with the selected thread_id
-            self.bot.tasks[self.guild_id] = [
-                task for task in self.bot.tasks[self.guild_id]
-                if task['type'] != 'thread_deletion' or
-                int(task['thread_id']) != selected_thread_id
-            ]
-
-            # Debug: Print tasks after deletion
-            #print(f"Tasks after deletion: {self.bot.tasks[self.guild_id]}")
-
-            if not self.bot.tasks[self.guild_id]:
-                del self.bot.tasks[self.guild_id]
-
-            self.bot.save_tasks()
-            await interaction.response.send_message("Deleted the selected thread task.", ephemeral=True)
-
-        select.callback = select_callback
-        await interaction.response.send_message("Select a thread task to delete:", view=view, ephemeral=True)
-
-    @discord.ui.button(label="List Tasks", style=discord.ButtonStyle.blurple)
-    async def list_tasks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.guild_id not in self.bot.tasks:
-            await interaction.response.send_message("No tasks scheduled for this server.", ephemeral=True)
-            return
-
-        unpin_tasks = []
-        thread_tasks = []
-
-        for task in self.bot.tasks[self.guild_id]:
-            try:
-                if task['type'] == 'unpin':
-                    unpin_time = task['unpin_time']
-                    if isinstance(unpin_time, str):
-                        formatted_time = datetime.fromisoformat(unpin_time).strftime("%H:%M | %m-%d-%Y")
-                    else:
-                        formatted_time = str(unpin_time)
-
-                    message_link = f"https://discord.com/channels/{self.guild_id}/{task['channel_id']}/{task['message_id']}"
-                    unpin_tasks.append(f"<#{task['channel_id']}> - {formatted_time}\n└ [Jump to Message]({message_link})")
-
-                elif task['type'] == 'thread_deletion':
-                    thread_deletion_time = task['thread_deletion_time']
-                    if isinstance(thread_deletion_time, str):
-                        formatted_time = datetime.fromisoformat(thread_deletion_time).strftime("%H:%M | %m-%d-%Y")
-                    else:
-                        formatted_time = str(thread_deletion_time)
-
-                    thread_link = f"https://discord.com/channels/{self.guild_id}/{task['channel_id']}/{task['thread_id']}"
-                    thread_tasks.append(f"<#{task['channel_id']}> - {formatted_time}\n└ [Jump to Thread]({thread_link})")
-            except Exception as e:
-                print(f"Error processing task: {task}. Error: {e}")
-                continue
-
-        task_message = ""
-
-        if unpin_tasks:
-            task_message += "**Unpin Tasks:**\n" + "\n\n".join(unpin_tasks) + "\n\n"
-
-        if thread_tasks:
-            task_message += "**Thread Deletion Tasks:**\n" + "\n\n".join(thread_tasks)
-
-        if not task_message:
-            task_message = "No tasks scheduled."
-
-        # Send the initial response
-        await interaction.response.send_message("Fetching tasks...", ephemeral=True)
-
-        # Split the message into chunks if it exceeds 2000 characters
-        if len(task_message) > 2000:
-            chunks = [task_message[i:i + 2000] for i in range(0, len(task_message), 2000)]
-            for chunk in chunks:
-                await interaction.followup.send(chunk, ephemeral=True)
+        # Remove every task for the selected message or thread, duplicates included
+        _, selected_task = found
+        if selected_task['type'] == 'unpin':
+            self.bot.cancel_message_tasks(selected_task['message_id'])
         else:
-            await interaction.followup.send(task_message, ephemeral=True)
+            self.bot.cancel_thread_tasks(selected_task['thread_id'])
+
+        await self.show(interaction, self.page)
+        await interaction.followup.send("Deleted the selected task.", ephemeral=True)
 
 class ConfirmRemoveView(discord.ui.View):
     def __init__(self, bot, interaction, action_type):
@@ -560,34 +377,20 @@ class ConfirmRemoveView(discord.ui.View):
         
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.green)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_id = str(self.interaction.guild.id) 
-        
+        guild_id = self.interaction.guild.id
+
         if self.action_type == 'invite':
-            with open('settings.json', 'r') as f:
-                settings = json.load(f)
-            
-            if guild_id not in settings or 'invite_link' not in settings[guild_id]:
+            if not self.bot.config_service.remove_setting(guild_id, 'invite_link'):
                 await interaction.response.send_message("⚠ No invite link found for this server.", ephemeral=True)
                 return
-            
-            del settings[guild_id]['invite_link']
-            
-            with open('settings.json', 'w') as f:
-                json.dump(settings, f, indent=4)
-            
+
             await interaction.response.send_message("🔗 Invite link removed for this server.", ephemeral=True)
         
         elif self.action_type == 'webhook':
-            webhooks = self.bot.webhooks
-            guild_id = self.interaction.guild.id
-            
-            if guild_id not in webhooks or not webhooks[guild_id]:
+            if not self.bot.config_service.remove_webhooks(guild_id):
                 await interaction.response.send_message("⚠ No webhook link found for this server.", ephemeral=True)
                 return
-            
-            del webhooks[guild_id]
-            self.bot.save_webhooks(webhooks)
-            
+
             await interaction.response.send_message("🔗 Webhook link removed for this server.", ephemeral=True)
 
         self.stop()
@@ -627,20 +430,13 @@ class AddChannelModal(discord.ui.Modal, title="Add Channel"):
         await self.add_channel(interaction, channel)
 
     async def add_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        guild_id = interaction.guild.id
-
-        if guild_id not in self.bot.monitored_channels:
-            self.bot.monitored_channels[guild_id] = []
-
-        if channel.id in self.bot.monitored_channels[guild_id]:
+        if not self.bot.config_service.add_channel(interaction.guild.id, channel.id):
             await interaction.response.send_message(
                 f"Channel {channel.mention} is already being monitored.",
                 ephemeral=True
             )
             return
 
-        self.bot.monitored_channels[guild_id].append(channel.id)
-        self.bot.save_monitored_channels()
         await interaction.response.send_message(
             f"Added {channel.mention} to the monitored channels.",
             ephemeral=True
@@ -658,15 +454,7 @@ class AddWebhookModal(discord.ui.Modal, title="Add Webhook"):
         self.bot = bot
 
     async def on_submit(self, interaction: discord.Interaction):
-        guild_id = interaction.guild.id
-        webhooks = self.bot.webhooks
-
-        if guild_id not in webhooks:
-            webhooks[guild_id] = []
-
-        if self.webhook_url.value not in webhooks[guild_id]:
-            webhooks[guild_id].append(self.webhook_url.value)
-            self.bot.save_webhooks(webhooks)
+        if self.bot.config_service.add_webhook(interaction.guild.id, self.webhook_url.value):
             await interaction.response.send_message("Webhook added for this server.", ephemeral=True)
         else:
             await interaction.response.send_message("This webhook URL is already added.", ephemeral=True)
@@ -685,13 +473,7 @@ class UnpinTimeModal(discord.ui.Modal, title="Set Unpin Time"):
     async def on_submit(self, interaction: discord.Interaction):
         try:
             minutes = int(self.minutes.value)
-            guild_id = str(interaction.guild.id)
-            
-            if guild_id not in self.bot.settings:
-                self.bot.settings[guild_id] = {}
-            
-            self.bot.settings[guild_id]['unpin_time'] = minutes
-            self.bot.save_settings()
+            self.bot.config_service.update_settings(interaction.guild.id, unpin_time=minutes)
             await interaction.response.send_message(f"Unpin time set to `{minutes} minute(s)`.", ephemeral=True)
         except ValueError:
             await interaction.response.send_message("Please enter a valid number.", ephemeral=True)
@@ -710,13 +492,7 @@ class ThreadTimeModal(discord.ui.Modal, title="Set Thread Deletion Time"):
     async def on_submit(self, interaction: discord.Interaction):
         try:
             minutes = int(self.minutes.value)
-            guild_id = str(interaction.guild.id)
-            
-            if guild_id not in self.bot.settings:
-                self.bot.settings[guild_id] = {}
-            
-            self.bot.settings[guild_id]['thread_deletion_time'] = minutes
-            self.bot.save_settings()
+            self.bot.config_service.update_settings(interaction.guild.id, thread_deletion_time=minutes)
             await interaction.response.send_message(f"Thread deletion time set to `{minutes} minute(s)`.", ephemeral=True)
         except ValueError:
             await interaction.response.send_message("Please enter a valid number.", ephemeral=True)
@@ -733,17 +509,27 @@ class InviteLinkModal(discord.ui.Modal, title="Set Invite Link"):
         self.bot = bot
 
     async def on_submit(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
-        
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-        
-        if guild_id not in settings:
-            settings[guild_id] = {}
-        
-        settings[guild_id]['invite_link'] = self.invite_link.value
-        
-        with open('settings.json', 'w') as f:
-            json.dump(settings, f, indent=4)
-        
-        await interaction.response.send_message("Invite link added for this server.", ephemeral=True) 
\ No newline at end of file
+        self.bot.config_service.update_settings(interaction.guild.id, invite_link=self.invite_link.value)
+
+        await interaction.response.send_message("Invite link added for this server.", ephemeral=True)
+
+class JumpToTimeModal(discord.ui.Modal, title="Jump to Time"):
+    due_time = discord.ui.TextInput(
+        label="Date and time (UTC)",
+        placeholder="YYYY-MM-DD HH:MM",
+        required=True
+    )
+
+    def __init__(self, view):
+        super().__init__()
+        self.tasks_view = view
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            due_time = datetime.strptime(self.due_time.value.strip(), "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+        except ValueError:
+            await interaction.response.send_message("Please enter a time as `YYYY-MM-DD HH:MM`.", ephemeral=True)
+            return
+
+        position = self.tasks_view.bot.task_index.position(self.tasks_view.guild_id, due_time)
+        await self.tasks_view.show(interaction, position // self.tasks_view.page_size)